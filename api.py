@@ -0,0 +1,261 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# A small HTTP API serving the data of the charts.
+#
+# Every get_df_* function of crime_data.py is an endpoint
+# with the same parameters, the data is loaded like in
+# the dashboard (see source.py and cube.py):
+#
+#   python api.py --port 8600
+#   curl 'http://127.0.0.1:8600/map?crime=All&year=2022&age_group=All&gender=All'
+#
+# The values of the controls can be given by their names
+# in the dashboard (crime type 'Assault', age group 'All')
+# or by their values in the tables. The result is JSON
+# ({"columns": [...], "data": [[...], ...]}) or, with
+# ?format=arrow or 'Accept: application/vnd.apache.arrow.stream',
+# an Arrow IPC stream.
+#
+# Every response has an ETag. A client sending it back in
+# If-None-Match gets '304 Not Modified' without a body.
+# The responses are cached until the tables change.
+# -----------------------------------------------------
+
+
+import argparse
+import hashlib
+import inspect
+import json
+import logging
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pyarrow as pa
+
+import crime_data
+import lru
+import metrics
+
+
+API_PORT = 8600
+
+# Path of the endpoint -> get_df_* function
+ENDPOINTS = {
+    'map': crime_data.get_df_map,
+    'top_crimes_germany': crime_data.get_top_crimes_germany,
+    'top_crimes_federal_states': crime_data.get_top_crimes_federal_states,
+    'pie': crime_data.get_df_overview_pie,
+    'linechart': crime_data.get_df_overview_linechart,
+    'growth_rate': crime_data.get_df_growth_rate,
+}
+
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+
+logger = logging.getLogger(__name__)
+
+# The encoded responses: (endpoint, arguments, format, crime_data.version) -> (etag, body)
+responses = lru.BoundedCache(max_entries=int(os.environ.get('CRIME_GER_API_CACHE_SIZE', 1024)), name='API responses')
+
+
+class BadRequest(Exception):
+    '''
+    Raised for a missing or invalid parameter of a request.
+    '''
+
+
+def parameter(name, values):
+    '''
+    Convert a parameter of a request to the argument of a get_df_* function.
+    Names of the controls of the dashboard are translated to the values in the tables.
+    @name (str): The name of the parameter, e.g. 'age_group'.
+    @values (list of str): The values of the parameter in the query string.
+    @return: The argument.
+    @raise BadRequest: If the value is invalid.
+    '''
+    value = values[-1]
+    if name in ('year', 'n'):
+        try:
+            return int(value)
+        except ValueError:
+            raise BadRequest(f"'{name}' must be a number")
+    if name in ('crime', 'crime_type'):
+        if value in crime_data.crime_types:
+            return crime_data.crime_types[value]
+        # 'schluessel' of the crimes, repeated or separated by commas
+        return [key for item in values for key in item.split(',') if key]
+    if name == 'state':
+        if value not in crime_data.federal_states:
+            raise BadRequest(f"Unknown state '{value}'")
+        return value
+    if name == 'age_group':
+        return crime_data.age_groups.get(value, value)
+    if name == 'gender':
+        return crime_data.genders.get(value, value)
+    return value
+
+
+def arguments(function, query):
+    '''
+    The arguments of a call of a get_df_* function from the query string.
+    They are positional, in the order of the parameters of the function.
+    @function (function): The get_df_* function.
+    @query (dict): Parameter -> list of values (see urllib.parse.parse_qs).
+    @return (tuple): The arguments.
+    @raise BadRequest: If a parameter is missing or invalid.
+    '''
+    args = []
+    for name, param in inspect.signature(function).parameters.items():
+        if name in query:
+            args.append(parameter(name, query[name]))
+        elif param.default is not inspect.Parameter.empty:
+            break # the optional parameters (n) are only given together
+        else:
+            raise BadRequest(f"Missing parameter '{name}'")
+    return tuple(args)
+
+
+def encode(df, fmt):
+    '''
+    Encode a result.
+    @df (pandas.Dataframe): The result of a get_df_* function.
+    @fmt (str): 'json' or 'arrow'.
+    @return (bytes): The body of the response.
+    '''
+    if fmt == 'arrow':
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    return df.to_json(orient='split', index=False, force_ascii=False).encode()
+
+
+def response(endpoint, args, fmt):
+    '''
+    Get the encoded result of a call from the cache or compute it.
+    @endpoint (str): The path of the endpoint.
+    @args (tuple): The arguments of the get_df_* function.
+    @fmt (str): 'json' or 'arrow'.
+    @return (str, bytes): The ETag and the body.
+    '''
+    def build():
+        body = encode(ENDPOINTS[endpoint](*args), fmt)
+        return '"' + hashlib.sha1(body).hexdigest()[:20] + '"', body
+    key = (endpoint, json.dumps(args, ensure_ascii=False), fmt, crime_data.version)
+    return responses.get(key, build)
+
+
+def index():
+    '''
+    The endpoints and their parameters.
+    @return (dict): Path -> list of parameters.
+    '''
+    return {f"/{endpoint}": list(inspect.signature(function).parameters) for endpoint, function in ENDPOINTS.items()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    # HEAD: the headers of GET (e.g. the ETag) without the body
+    head_only = False
+
+    def do_HEAD(self):
+        self.head_only = True
+        self.do_GET()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        endpoint = url.path.strip('/')
+        query = parse_qs(url.query)
+        if endpoint == '':
+            self.send_body(200, json.dumps(index()).encode(), 'application/json')
+            return
+        if endpoint not in ENDPOINTS:
+            self.send_body(404, json.dumps({'error': f"Unknown endpoint '/{endpoint}'"}).encode(), 'application/json')
+            return
+        fmt = query.pop('format', ['arrow' if ARROW_TYPE in self.headers.get('Accept', '') else 'json'])[-1]
+        try:
+            if fmt not in ('json', 'arrow'):
+                raise BadRequest("'format' must be 'json' or 'arrow'")
+            args = arguments(ENDPOINTS[endpoint], query)
+            with metrics.span(f"api_{endpoint}"):
+                etag, body = response(endpoint, args, fmt)
+        except (BadRequest, ValueError) as err:
+            self.send_body(400, json.dumps({'error': str(err)}).encode(), 'application/json')
+            return
+        except crime_data.NoData as err:
+            # Valid parameters, but there is no data for them (e.g. a year not in the tables)
+            self.send_body(404, json.dumps({'error': str(err)}).encode(), 'application/json')
+            return
+        except Exception as err:
+            logger.exception("API: %s failed", self.path)
+            self.send_body(500, json.dumps({'error': str(err)}).encode(), 'application/json')
+            return
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_body(200, body, ARROW_TYPE if fmt == 'arrow' else 'application/json', etag)
+
+    def send_body(self, status, body, content_type, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if etag is not None:
+            self.send_header('ETag', etag)
+            # Cached by clients, but checked with the ETag every time
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        if not self.head_only:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("API: " + format, *args)
+
+
+def load_data(refresh_interval=None):
+    '''
+    Load the data like the dashboard does at start (tables and cube,
+    or the slice reader in query mode) and keep it up to date (see refresh.py).
+    @refresh_interval (float): Seconds between checks for new data (default: refresh.REFRESH_INTERVAL, 0: never).
+    '''
+    import cube
+    import refresh
+    import source
+    if source.is_query_mode():
+        crime_data.set_slice_reader(source.read_slice, source.available_years())
+        return
+    crime_data.set_tables(source.load(), load_partition=source.load_partition)
+    cube.load_or_build()
+    interval = refresh.REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+    if interval:
+        # The cached responses carry crime_data.version, new tables get new ones
+        refresh.Refresher(interval, on_change=[lambda names: responses.clear(),
+                                               lambda names: cube.load_or_build(background=False)]).start()
+
+
+def serve(port=API_PORT, host='127.0.0.1'):
+    '''
+    Serve the API on http://host:port/ (blocks).
+    @port (int): The port.
+    @host (str): The address to listen on, only local by default.
+    '''
+    server = ThreadingHTTPServer((host, port), _Handler)
+    logger.info("API on http://%s:%d/", host, port)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='HTTP API serving the data of the charts of the dashboard.')
+    parser.add_argument('--port', type=int, default=API_PORT, help=f"port (default: {API_PORT})")
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--metrics-port', type=int, default=os.environ.get('CRIME_GER_METRICS_PORT'), help='also serve the metrics on this port')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    load_data()
+    if args.metrics_port:
+        metrics.register('api_cache', responses.stats)
+        metrics.start_server(int(args.metrics_port))
+    serve(args.port, args.host)
@@ -0,0 +1,262 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Headless benchmark of the reruns of the dashboard.
+#
+# app.py is run with Streamlit's app testing API against
+# the local snapshot (offline mode, see snapshot.py). Some
+# typical sequences of control changes are played and the
+# time, peak memory and time per section of every rerun
+# (the spans of metrics.py) are measured and compared to
+# a stored baseline:
+#
+#   python benchmark.py --save-baseline   # store the baseline
+#   python benchmark.py                   # compare to it
+#   python benchmark.py --smoke           # only check that it runs
+# -----------------------------------------------------
+
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+
+BASELINE_FILE = 'benchmark_baseline.json'
+
+# Sequences of control changes: name -> list of (label, widget, key, value)
+# widget is the kind of the control, key its session state key ('reset' presses the reset button)
+SEQUENCES = {
+    'year': [
+        ('start', None, None, None),
+        ('year 2021', 'slider', 'year', 2021),
+        ('year 2020', 'slider', 'year', 2020),
+        ('year 2018', 'slider', 'year', 2018),
+    ],
+    'federal_state': [
+        ('start', None, None, None),
+        ('state Bayern', 'selectbox', 'federal_state', 'Bayern'),
+        ('state Berlin', 'selectbox', 'federal_state', 'Berlin'),
+        ('state Germany', 'selectbox', 'federal_state', 'Germany'),
+    ],
+    'crime_type': [
+        ('start', None, None, None),
+        ('crime Assault', 'selectbox', 'crime_type', 'Assault'),
+        ('crime Shoplifting', 'selectbox', 'crime_type', 'Shoplifting'),
+        ('crime Robbery', 'selectbox', 'crime_type', 'Robbery'),
+    ],
+    'abs_rel': [
+        ('start', None, None, None),
+        ('absolute', 'radio', 'abs_rel', 'Absolute'),
+        ('relative', 'radio', 'abs_rel', 'Relative'),
+    ],
+    'mixed': [
+        ('start', None, None, None),
+        ('state Hessen', 'selectbox', 'federal_state', 'Hessen'),
+        ('age 16 to <18', 'selectbox', 'age_group', '16 to <18'),
+        ('gender Female', 'radio', 'gender', 'Female'),
+        ('year 2019', 'slider', 'year', 2019),
+        ('absolute', 'radio', 'abs_rel', 'Absolute'),
+        ('reset', 'reset', None, None),
+    ],
+}
+
+def section_times(before, after):
+    '''
+    The time spent in every section between two readings of metrics.totals().
+    @return (dict): Section -> seconds.
+    '''
+    return {section: totals['sum'] - before.get(section, {}).get('sum', 0.0)
+            for section, totals in after.items()
+            if totals['count'] != before.get(section, {}).get('count', 0)}
+
+
+def apply(trees, widget, key, value):
+    '''
+    Change one control of the app (without running it).
+    A control in the sidebar only reruns the sections reading it (see
+    sections.rerun_dependents()), the tree of such a run has the elements of
+    these sections only. The control is taken from the newest run having it.
+    @trees (list of ElementTree): The trees of the runs so far, the newest first.
+    @widget (str): The kind of the control ('reset' presses the reset button).
+    @key (str): The session state key of the control.
+    @value: The new value.
+    @return (ElementTree): The tree holding the control, to run next.
+    '''
+    for tree in trees:
+        if widget == 'reset':
+            button = next((button for button in tree.button if 'Reset' in button.label), None)
+            if button is not None:
+                button.click()
+                return tree
+        else:
+            try:
+                control = getattr(tree, widget)(key=key)
+            except KeyError:
+                continue
+            control.set_value(value)
+            return tree
+    raise LookupError(f"app.py has no {widget} {key!r}" if key else f"app.py has no {widget} button")
+
+
+def run_sequence(name, steps, cold, trace_memory):
+    '''
+    Play one sequence of control changes and measure every rerun.
+    Tracing the memory slows Python down a lot, so the time is only
+    meaningful in runs without it (and the peak memory only with it).
+    @name (str): The name of the sequence.
+    @steps (list): The steps of the sequence (see SEQUENCES).
+    @cold (bool): Clear all Streamlit caches before the sequence.
+    @trace_memory (bool): Measure the peak memory (of Python allocations).
+    @return (list of dict): One measurement per step.
+    '''
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+    import metrics
+
+    if cold:
+        st.cache_data.clear()
+        st.cache_resource.clear()
+    at = AppTest.from_file(os.path.abspath('app.py'), default_timeout=120)
+    trees = []
+    results = []
+    for label, widget, key, value in steps:
+        tree = at
+        if widget is not None:
+            try:
+                tree = apply(trees, widget, key, value)
+            except LookupError as err:
+                raise RuntimeError(f"{name}/{label}: {err}") from None
+        before = metrics.totals()
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        tree.run()
+        seconds = time.perf_counter() - start
+        trees.insert(0, at.main.root)
+        peak = None
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        if at.exception:
+            raise RuntimeError(f"{name}/{label}: {at.exception[0].message}")
+        results.append({'step': label, 'seconds': seconds, 'peak_bytes': peak, 'sections': section_times(before, metrics.totals())})
+    return results
+
+
+def run(sequences, repeat, cold):
+    '''
+    Run the sequences several times and take the median of every step.
+    The peak memory is measured in one more run of every sequence.
+    @sequences (list of str): Names of the sequences to run.
+    @repeat (int): How often every sequence is run.
+    @cold (bool): Clear all Streamlit caches before every sequence.
+    @return (dict): Sequence -> step -> {'seconds', 'peak_bytes', 'sections'}.
+    '''
+    runs = defaultdict(lambda: defaultdict(list))
+    peaks = defaultdict(dict)
+    for _ in range(repeat):
+        for name in sequences:
+            for result in run_sequence(name, SEQUENCES[name], cold, trace_memory=False):
+                runs[name][result['step']].append(result)
+    for name in sequences:
+        for result in run_sequence(name, SEQUENCES[name], cold, trace_memory=True):
+            peaks[name][result['step']] = result['peak_bytes']
+    report = {}
+    for name, steps in runs.items():
+        report[name] = {}
+        for step, results in steps.items():
+            sections = sorted({section for result in results for section in result['sections']})
+            report[name][step] = {
+                'seconds': statistics.median(result['seconds'] for result in results),
+                'peak_bytes': peaks[name][step],
+                'sections': {section: statistics.median(result['sections'].get(section, 0) for result in results) for section in sections},
+            }
+    return report
+
+
+def smoke(sequences):
+    '''
+    Play every sequence once, without measuring, to check that they still run.
+    @sequences (list of str): Names of the sequences to run.
+    @raise RuntimeError: If a control is missing or a run of app.py fails.
+    '''
+    for name in sequences:
+        run_sequence(name, SEQUENCES[name], cold=False, trace_memory=False)
+
+
+def compare(report, baseline, tolerance):
+    '''
+    Compare a report to the baseline.
+    @report (dict): The report from run().
+    @baseline (dict): The stored report.
+    @tolerance (float): Allowed slow down, e.g. 0.2 for 20 %.
+    @return (list of str): The steps that got slower (or use more memory) than allowed.
+    '''
+    regressions = []
+    for name, steps in report.items():
+        for step, result in steps.items():
+            base = baseline.get(name, {}).get(step)
+            if base is None:
+                continue
+            if result['seconds'] > base['seconds'] * (1 + tolerance):
+                regressions.append(f"{name}/{step}: {1000 * base['seconds']:.1f} -> {1000 * result['seconds']:.1f} ms")
+            if result['peak_bytes'] > base['peak_bytes'] * (1 + tolerance):
+                regressions.append(f"{name}/{step}: peak {base['peak_bytes'] // 1024} -> {result['peak_bytes'] // 1024} KiB")
+    return regressions
+
+
+def print_report(report, baseline):
+    for name, steps in report.items():
+        print(f"\n{name}")
+        for step, result in steps.items():
+            base = baseline.get(name, {}).get(step)
+            change = f" ({100 * (result['seconds'] / base['seconds'] - 1):+.0f} %)" if base and base['seconds'] else ''
+            sections = ', '.join(f"{section} {1000 * seconds:.1f}" for section, seconds in result['sections'].items() if seconds >= 0.0005)
+            print(f"  {step:<20} {1000 * result['seconds']:>8.1f} ms{change:<9} peak {result['peak_bytes'] // 1024:>7} KiB  [{sections}]")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless benchmark of the reruns of the dashboard.')
+    parser.add_argument('--snapshot', default=os.environ.get('CRIME_GER_SNAPSHOT_DIR', 'data/snapshot'), help='snapshot directory with the data (default: data/snapshot)')
+    parser.add_argument('--sequence', action='append', choices=list(SEQUENCES), help='sequence to run (default: all, can be repeated)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of every sequence, the median is taken (default: 3)')
+    parser.add_argument('--cold', action='store_true', help='clear all Streamlit caches before every sequence')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help=f"baseline file (default: {BASELINE_FILE})")
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slow down before failing (default: 0.2 = 20 %%)')
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--smoke', action='store_true', help='only check that every sequence runs (no measurements)')
+    args = parser.parse_args()
+
+    os.environ['CRIME_GER_DATA_SOURCE'] = 'snapshot'
+    os.environ['CRIME_GER_SNAPSHOT_DIR'] = os.path.abspath(args.snapshot)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    if args.smoke:
+        smoke(args.sequence or list(SEQUENCES))
+        print('All sequences ran.')
+        sys.exit(0)
+
+    report = run(args.sequence or list(SEQUENCES), args.repeat, args.cold)
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+    elif baseline:
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print('\nSlower than the baseline:\n  ' + '\n  '.join(regressions))
+            sys.exit(1)
+        print('\nNo regressions against the baseline.')
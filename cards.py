@@ -0,0 +1,136 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# The cards with the growth rates of the dashboard.
+#
+# The HTML of the cards and of the icons is put together
+# once at import, a rerun only fills in the values.
+# -----------------------------------------------------
+
+
+import numpy as np
+import pandas as pd
+
+
+# SVG images (arrows and circles) for growth rate
+arrow_down = """<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" fill="{color}" class="bi bi-arrow-down-right-circle" viewBox="0 0 16 16">
+                    <path fill-rule="evenodd" d="M1 8a7 7 0 1 0 14 0A7 7 0 0 0 1 8zm15 0A8 8 0 1 1 0 8a8 8 0 0 1 16 0zM5.854 5.146a.5.5 0 1 0-.708.708L9.243 9.95H6.475a.5.5 0 1 0 0 1h3.975a.5.5 0 0 0 .5-.5V6.475a.5.5 0 1 0-1 0v2.768L5.854 5.146z"/>
+                </svg>"""
+arrow_up = """<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" fill="{color}" class="bi bi-arrow-up-right-circle" viewBox="0 0 16 16">
+                    <path fill-rule="evenodd" d="M1 8a7 7 0 1 0 14 0A7 7 0 0 0 1 8zm15 0A8 8 0 1 1 0 8a8 8 0 0 1 16 0zM5.854 10.803a.5.5 0 1 1-.708-.707L9.243 6H6.475a.5.5 0 1 1 0-1h3.975a.5.5 0 0 1 .5.5v3.975a.5.5 0 1 1-1 0V6.707l-4.096 4.096z"/>
+                </svg>"""
+circle = """<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" fill="{color}" class="bi bi-dash-circle" viewBox="0 0 16 16">
+                <path d="M8 15A7 7 0 1 1 8 1a7 7 0 0 1 0 14zm0 1A8 8 0 1 0 8 0a8 8 0 0 0 0 16z"/>
+                <path d="M4 8a.5.5 0 0 1 .5-.5h7a.5.5 0 0 1 0 1h-7A.5.5 0 0 1 4 8z"/>
+            </svg>"""
+
+red = '#ec5347'
+green = '#5abf41'
+blue = '#1a60bc'
+dgray = '#757989'
+size = 20
+
+# Growth -> arrow up (red), decrease -> arrow down (green), no change or no value -> circle
+icon_up = arrow_up.format(size=size, color=red)
+icon_down = arrow_down.format(size=size, color=green)
+icon_none = circle.format(size=size, color=dgray)
+
+# Shown instead of a missing growth rate (e.g. for the first year)
+MISSING = 'n.a.'
+
+# CSS for the boxes with the numbers
+BOX_STYLE = """
+            <style>.box{
+                padding: 3px;
+                margin: 2px;
+                border:1px solid;
+                border-radius: 10px;
+                display: inline-block;
+                text-align: center;
+            }</style>
+            """
+
+BOX_START = "<span class=box><span style='font-size:0.8rem;'>"
+BOX_VALUE = "</span><br><span style='font-size:1.1rem;'>"
+BOX_ICON = "</span><br>"
+BOX_END = "</span>"
+
+CARD = """
+                <div style='border:1px solid; border-color: #e3e7ee; padding: 15px; border-radius: 10px;'>
+                    <h5 style='margin-bottom:0.5rem; padding-bottom:0rem;'>""" + arrow_up.format(size=32, color=blue) + """&nbsp;&nbsp;Growth Rates in %</h5>
+                    <h6 style='margin-top:0rem; margin-bottom:0.5rem; padding-bottom:0rem;'>{title}</h6>
+                    <span style='margin-bottom: 0.7rem; display:block;'>
+                    <b>State:</b> {state},
+                    <b>Year:</b> {year},
+                    <b>Crime:</b> {crime}<br>
+                    <b>Age:</b> {age},
+                    <b>Gender:</b> {sex}<br>
+                    </span>
+                    {boxes}
+                </div>
+    """
+
+
+# ---------------------------------
+# Corrections for displaying
+# ---------------------------------
+
+def display_sex(gender):
+    '''
+    Correct the display of the gender.
+    @gender (str): The gender of the controls, e.g. 'Male'.
+    @return (str): 'M', 'F' or 'X' (all).
+    '''
+    if gender == 'Male':
+        return 'M'
+    elif gender == 'Female':
+        return 'F'
+    return 'X'
+
+
+def display_age(age_group):
+    '''
+    Correct the display of the age group.
+    @age_group (str): The age group of the controls, e.g. '14 to <16'.
+    @return (str): The age group in words.
+    '''
+    if age_group == '14 to <16':
+        return '14 to under 16'
+    elif age_group == '16 to <18':
+        return '16 to under 18'
+    elif age_group == '18 to <21':
+        return '18 to under 21'
+    elif age_group == 'All':
+        #age_group 'All'
+        return '14 to under 21'
+    return ''
+
+
+# ---------------------------------
+# Cards
+# ---------------------------------
+
+def growth_boxes(df, column):
+    '''
+    The boxes with the growth rate of every year, built for all years at once.
+    @df (pandas.Dataframe): The growth rates from get_df_growth_rate().
+    @column (str): 'growth_abs' or 'growth_rel'.
+    @return (str): The HTML of the boxes.
+    '''
+    values = df[column].astype('float64').to_numpy() # missing values are NaN
+    missing = np.isnan(values)
+    icons = np.select([missing, values < 0, values > 0], [icon_none, icon_down, icon_up], icon_none)
+    texts = pd.Series(np.where(missing, MISSING, np.char.mod('%.2f', values)), index=df.index)
+    boxes = BOX_START + df['year'].astype(str) + BOX_VALUE + texts + BOX_ICON + pd.Series(icons, index=df.index) + BOX_END
+    return '\n                    '.join(boxes)
+
+
+def growth_card(df, column, title, state, year, crime, age, sex):
+    '''
+    The card with the growth rates of all years.
+    @df (pandas.Dataframe): The growth rates from get_df_growth_rate().
+    @column (str): 'growth_abs' or 'growth_rel'.
+    @title (str): 'Absolute' or 'Relative'.
+    @state, year, crime, age, sex: The selection shown on the card.
+    @return (str): The HTML of the card.
+    '''
+    return CARD.format(title=title, state=state, year=year, crime=crime, age=age, sex=sex, boxes=growth_boxes(df, column))
@@ -0,0 +1,72 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Memory-compact representation of the loaded tables.
+#
+# The text columns repeat the same few long german strings
+# (federal states, crime keys and names, age groups) on
+# every row. They are turned into categoricals, which store
+# every string once and a small integer code per row.
+# Integer columns are downcast to the smallest type that
+# holds their values.
+# -----------------------------------------------------
+
+
+import logging
+
+import pandas as pd
+
+
+# Text columns that are always turned into categoricals
+CATEGORY_COLUMNS = ['bundesland', 'schluessel', 'age_group', 'sexus', 'straftat']
+
+# Other text columns are turned into categoricals, if they have less
+# distinct values than this share of their rows (e.g. crimes_on_rank_1)
+MAX_DISTINCT_SHARE = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+def compact_table(df):
+    '''
+    Make a memory-compact copy of a table.
+    Only lossless changes are made: the values stay the same, only
+    the types change (floats are not downcast, that would change
+    their values).
+    @df (pandas.Dataframe): The table.
+    @return (pandas.Dataframe): The compact table.
+    '''
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_integer_dtype(series.dtype) and not pd.api.types.is_extension_array_dtype(series.dtype):
+            downcast = pd.to_numeric(series, downcast='integer')
+            if downcast.dtype != series.dtype:
+                columns[col] = downcast
+        elif pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+            # Only pure text columns (no mixed numbers/texts, no missing values)
+            if col in CATEGORY_COLUMNS or series.nunique(dropna=False) <= MAX_DISTINCT_SHARE * len(series):
+                if series.map(type).eq(str).all():
+                    columns[col] = series.astype('category')
+    if not columns:
+        return df
+    return df.assign(**columns)
+
+
+def compact_tables(dataframes):
+    '''
+    Make memory-compact copies of all tables and write the memory
+    used by every table before and after to the log.
+    @dataframes (dict): Name of the dataframe -> pandas.Dataframe.
+    @return (dict, list of dict): The compact tables by name and the report
+        with one entry {'table', 'bytes_before', 'bytes_after'} per table.
+    '''
+    compacted, report = {}, []
+    for name, df in dataframes.items():
+        before = int(df.memory_usage(deep=True).sum())
+        compacted[name] = compact_table(df)
+        after = int(compacted[name].memory_usage(deep=True).sum())
+        report.append({'table': name, 'bytes_before': before, 'bytes_after': after})
+        logger.info("Compacted %s: %d -> %d bytes (%.0f %%)", name, before, after, 100 * after / before if before else 100)
+    return compacted, report
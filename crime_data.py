@@ -0,0 +1,643 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# The data behind the charts of the dashboard.
+#
+# The keys and names used in the controls and one function
+# for the data of every chart (get_df_*). The functions
+# work on the tables handed over with set_tables(), so
+# they can be used by the dashboard as well as by scripts
+# without Streamlit (e.g. cube.py).
+# -----------------------------------------------------
+
+
+import functools
+import inspect
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import compact
+import lookup
+import metrics
+import pks
+
+
+#------------------------
+# Keys and names
+#------------------------
+federal_states = ['Germany', 'Baden-Württemberg', 'Bayern', 'Berlin', 'Brandenburg', 'Bremen',
+                  'Hamburg', 'Hessen', 'Mecklenburg-Vorpommern', 'Niedersachsen', 
+                  'Nordrhein-Westfalen', 'Rheinland-Pfalz', 'Saarland', 'Sachsen',
+                  'Sachsen-Anhalt', 'Schleswig-Holstein', 'Thüringen'
+]
+
+# Keys of selected crimes (these keys are used in the data of BKA)
+crime_types = {'All':['------'],
+            #    'Other': ['other'],
+               'Homicide': ['010000, 020010'], #Mord und Totschlag
+               'Assault': ['220000'], #Körperverletzung
+               'Sexual offences': ['100000'], #Sexuelle Straftaten
+               'Deprivation of liberty': ['232100'], #Freiheitsberaubung
+               'Coercion': ['232200'], #Nötigung
+               'Residential burglary': ['435*00'], #Wohnungseinbruchdiebstahl
+               'Shoplifting': ['*26*00'], #Ladendiebstahl
+               'Robbery': ['210000'], #Raub
+               'Drug offences (w/o procurement)': ['730000'], #Rauschgiftdelikte (ohne Beschaffungskriminalität)
+               'Drug procurement crime': ['891100'], #Rauschgift-Beschaffungskriminalität
+               'Damage to property': ['674000'], #Sachbeschädigung
+}
+
+# Defined age groups
+age_groups = {"All": 'jugendl_u_heranwachsende_14_bis_unter_21',
+              "14 to <16": 'jugendliche_14_bis_unter_16',
+              "16 to <18": 'jugendliche_16_bis_unter_18',
+              "18 to <21": 'heranwachsende_18_bis_unter_21',
+            #   "14 to <21": 'jugendl_u_heranwachsende_14_bis_unter_21',
+}
+
+# Define Gender groups
+genders = {
+    'All': 'X',
+    'Female': 'W',
+    'Male': 'M'
+}
+
+# Translate keys of crimes to shortened english names
+crime_german_to_english = {
+    '------': 'All',
+    '010000, 020010': 'Homicide',
+    '220000': 'Assault',
+    '100000': 'Sexual offences',
+    '232100': 'Deprivation of liberty',
+    '232200': 'Coercion',
+    '435*00': 'Residential burglary',
+    '*26*00': 'Shoplifting',
+    '210000': 'Robbery',
+    '730000': 'Drug offences (w/o procurement)',
+    '891100': 'Drug procurement crime',
+    '674000': 'Damage to property',
+    'other': 'other'
+}
+
+# Own groups of crimes: name -> patterns of PKS keys (see pks.py), e.g. {'Theft': ['435*00', '*26*00']}.
+# They are read from the JSON file in CRIME_GER_CRIME_GROUPS and added to the crime types,
+# the matching keys are added up when a chart is computed (see combine_crimes())
+crime_groups = {}
+
+
+def crime_group_key(patterns):
+    '''
+    The 'schluessel' of a group of crimes in the combined rows.
+    @patterns (list of str): The patterns of the group.
+    @return (str): The patterns separated by commas.
+    '''
+    return ', '.join(patterns)
+
+
+def add_crime_groups(groups):
+    '''
+    Add own groups of crimes to the crime types of the controls.
+    @groups (dict): Name -> pattern or list of patterns of PKS keys.
+    '''
+    for name, patterns in groups.items():
+        patterns = [patterns] if isinstance(patterns, str) else list(patterns)
+        crime_groups[name] = patterns
+        crime_types[name] = patterns
+        crime_german_to_english.setdefault(crime_group_key(patterns), name)
+
+
+if os.environ.get('CRIME_GER_CRIME_GROUPS'):
+    with open(os.environ['CRIME_GER_CRIME_GROUPS'], encoding='utf-8') as f:
+        add_crime_groups(json.load(f))
+
+# Number of crimes in the ranking of the top crimes
+# (read when the top crimes are computed, so it can be changed at runtime)
+TOP_N = int(os.environ.get('CRIME_GER_TOP_N', 3))
+
+# The Years for which the Dashboard has data
+# (found in the loaded tables by set_tables(), these are the years until the first load)
+years = [2018, 2019, 2020, 2021, 2022]
+
+
+#------------------------
+# Loaded data
+#------------------------
+
+# The tables the get_df_* functions read
+TABLE_NAMES = ['df_distribution_crime', 'df_laender_abs_rel', 'df_bund_laender_abs_rel']
+
+# Tables that the get_df_* functions filter on one year: they are kept in one partition
+# per year and older partitions are only loaded when a session selects their year
+YEAR_PARTITIONED = ['df_distribution_crime', 'df_laender_abs_rel']
+
+# The loaded tables with their lookup index (see lookup.py):
+# name of the dataframe -> (pandas.Dataframe, lookup.TableIndex)
+tables = {}
+
+# The loaded partitions of the YEAR_PARTITIONED tables:
+# name of the dataframe -> year -> (pandas.Dataframe, lookup.TableIndex)
+partitions = {}
+
+# Loads a missing partition: function(name, year) -> pandas.Dataframe, None if all are loaded
+partition_loader = None
+_partition_lock = threading.Lock()
+
+# Reads the rows of a chart from the database instead of the loaded tables (query mode, see source.py):
+# function(name, columns, values) -> pandas.Dataframe, None if the tables are loaded
+slice_reader = None
+
+# Precomputed results of the get_df_* functions (see cube.py), None if not loaded
+cube = None
+
+# Counts the changes of the tables, e.g. by a refresh (see refresh.py)
+version = 0
+
+
+def _index_tables(dataframes):
+    '''
+    Make tables memory-compact (see compact.py) and build their lookup indexes.
+    @dataframes (dict): Name of the dataframe -> pandas.Dataframe.
+    @return (dict): Name of the dataframe -> (pandas.Dataframe, lookup.TableIndex).
+    '''
+    dataframes, report = compact.compact_tables(dataframes)
+    return {
+        name: (df, lookup.TableIndex(df, lookup.INDEX_COLUMNS[name]) if name in lookup.INDEX_COLUMNS else None)
+        for name, df in dataframes.items()
+    }
+
+
+def _split(dataframes):
+    '''
+    Split the tables into the whole tables and the partitions of the
+    YEAR_PARTITIONED tables, both memory-compact and indexed.
+    @dataframes (dict): Name of the dataframe -> pandas.Dataframe.
+    @return (dict, dict): name -> (df, index) and name -> year -> (df, index).
+    '''
+    whole = _index_tables({name: df for name, df in dataframes.items() if name not in YEAR_PARTITIONED})
+    parts = {}
+    for name, df in dataframes.items():
+        if name in YEAR_PARTITIONED:
+            by_year = {int(year): part.reset_index(drop=True) for year, part in df.groupby('year', sort=True)}
+            parts[name] = {year: _index_tables({name: part})[name] for year, part in by_year.items()}
+    return whole, parts
+
+
+def _find_years(whole, parts):
+    '''
+    All years in the loaded data (the whole tables contain all years,
+    the partitioned ones might only be loaded for the latest years).
+    '''
+    found = set()
+    for df, index in whole.values():
+        if 'year' in df.columns:
+            found.update(int(year) for year in df['year'].unique())
+    for by_year in parts.values():
+        found.update(by_year)
+    return sorted(found) or years
+
+
+def set_tables(dataframes, load_partition=None):
+    '''
+    Hand over the loaded tables, make them memory-compact (see compact.py)
+    and build their lookup indexes. The years of the dashboard are taken
+    from the tables.
+    The new tables replace the old ones all at once, so a chart
+    never gets a table together with the index of another one.
+    @dataframes (dict): Name of the dataframe -> pandas.Dataframe. The
+        YEAR_PARTITIONED tables may only contain some of the years.
+    @load_partition (function): Loads the partition of a missing year,
+        function(name, year) -> pandas.Dataframe.
+    '''
+    global tables, partitions, partition_loader, slice_reader, years, version
+    whole, parts = _split(dataframes)
+    if load_partition is not None:
+        partition_loader = load_partition
+    years = _find_years(whole, parts)
+    tables, partitions, slice_reader = whole, parts, None
+    version += 1
+
+
+def set_slice_reader(read_slice, available_years):
+    '''
+    Query mode: the get_df_* functions read only the rows they need
+    with read_slice() instead of looking them up in loaded tables.
+    @read_slice (function): function(name, columns, values, sums=()) -> pandas.Dataframe,
+        see source.read_slice().
+    @available_years (list of int): The years in the data.
+    '''
+    global tables, partitions, slice_reader, years, version
+    years = sorted(available_years) or years
+    tables, partitions, slice_reader = {}, {}, read_slice
+    version += 1
+
+
+def update_tables(dataframes):
+    '''
+    Replace some of the loaded tables (e.g. the ones that changed in the
+    database), the other tables and their indexes are kept. Partitions
+    of a replaced table that are not given are loaded again when needed.
+    The precomputed results belong to the old tables, so the cube is
+    dropped (load it again with cube.load_or_build()).
+    @dataframes (dict): Name of the dataframe -> pandas.Dataframe.
+    '''
+    global tables, partitions, cube, years, version
+    whole, parts = _split(dataframes)
+    whole, parts = {**tables, **whole}, {**partitions, **parts}
+    cube = None
+    years = _find_years(whole, parts)
+    tables, partitions = whole, parts
+    version += 1
+
+
+class NoData(LookupError):
+    '''
+    Raised if there is no data for valid arguments, e.g. a year that is
+    not in the tables.
+    '''
+
+
+def _partition(name, year):
+    '''
+    Get a partition, load it if it is not loaded yet.
+    @name (str): The name of a YEAR_PARTITIONED dataframe.
+    @year (int): The year.
+    @return (pandas.Dataframe, lookup.TableIndex): The partition.
+    @raise NoData: If there is no data for the year.
+    '''
+    part = partitions[name].get(year)
+    if part is not None:
+        return part
+    # Only one session loads a partition, the others wait for it
+    with _partition_lock:
+        part = partitions[name].get(year)
+        if part is None:
+            if partition_loader is None or year not in years:
+                raise NoData(f"No data for {year} in {name}")
+            with metrics.span('load_partition'):
+                part = _index_tables({name: partition_loader(name, year).reset_index(drop=True)})[name]
+            # Copy on write, running lookups keep the dict they already have
+            partitions[name] = {**partitions[name], year: part}
+    return part
+
+
+def table_names():
+    '''
+    The names of all loaded tables.
+    @return (list of str): The names of the dataframes.
+    '''
+    return list(tables) + list(partitions)
+
+
+def loaded_years(name=None):
+    '''
+    The years whose partitions are loaded.
+    @name (str): The name of a YEAR_PARTITIONED dataframe, by default the years
+        loaded for all of them are returned.
+    @return (list of int): The years.
+    '''
+    if name is not None:
+        return sorted(partitions.get(name, {}))
+    loaded = [set(by_year) for by_year in partitions.values()]
+    return sorted(set.intersection(*loaded)) if loaded else list(years)
+
+
+def get_table(name):
+    '''
+    Get one of the loaded tables (of a YEAR_PARTITIONED table all loaded partitions).
+    @name (str): The name of the dataframe, e.g. 'df_laender_abs_rel'.
+    @return (pandas.Dataframe): The table.
+    '''
+    if name in partitions:
+        return pd.concat([df for year, (df, index) in sorted(partitions[name].items())], ignore_index=True)
+    return tables[name][0]
+
+
+def _lookup(name, columns=None, **values):
+    '''
+    Get the rows of a loaded table with its lookup index
+    (in query mode from the database, see set_slice_reader()).
+    @name (str): The name of the dataframe, e.g. 'df_laender_abs_rel'.
+    @columns (list of str): Only these columns (default: all).
+    @values: One value or a list of values for every indexed column
+        (only one year for the YEAR_PARTITIONED tables). The values of
+        'schluessel' are patterns of PKS keys (see pks.py), they are
+        matched against the keys of the table.
+    @return (pandas.Dataframe): The matching rows.
+    '''
+    reader = slice_reader
+    if reader is not None:
+        return reader(name, columns, values)
+    if name in partitions:
+        df, index = _partition(name, int(values['year']))
+    else:
+        df, index = tables[name]
+    if 'schluessel' in values:
+        crime = values['schluessel']
+        patterns = tuple(crime) if isinstance(crime, (list, tuple, set)) else (crime,)
+        values['schluessel'] = list(pks.matching_keys(patterns, index.values('schluessel')))
+    df = index.lookup(df, **values)
+    return df if columns is None else df[columns]
+
+
+def call_arguments(function, args, kwargs):
+    '''
+    The arguments of a call of a get_df_* function as one tuple in the order
+    of its parameters, with the defaults filled in (n=None is the current
+    TOP_N). A call with keywords has the same key in the cube as without.
+    @function (function): The get_df_* function.
+    @args (tuple): The positional arguments of the call.
+    @kwargs (dict): The keyword arguments of the call.
+    @return (tuple): The arguments.
+    '''
+    bound = inspect.signature(function).bind(*args, **kwargs)
+    bound.apply_defaults()
+    if 'n' in bound.arguments and bound.arguments['n'] is None:
+        bound.arguments['n'] = TOP_N
+    return bound.args
+
+
+def precomputed(function):
+    '''
+    Decorator for the get_df_* functions: if the cube is loaded and
+    contains the result for the given arguments, it is taken from
+    there, otherwise the function computes it.
+    Every call is timed as a section named like the function (see metrics.py).
+    The undecorated function is available as function.__wrapped__.
+    '''
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with metrics.span(function.__name__):
+            current = cube
+            if current is not None:
+                df = current.get(function.__name__, call_arguments(function, args, kwargs))
+                if df is not None:
+                    return df
+            return function(*args, **kwargs)
+    return wrapper
+
+
+#------------------------
+# Data for the charts
+#------------------------
+
+@precomputed
+def get_df_map(crime, year, age_group, gender):
+    '''
+    Get the data for plotting the Map.
+    @crime (list of str): The 'schluessel' = crime_type from the DB to be filtered.
+    @year (int): The year to be filtered
+    @age_group (str): One of the age_group's from the DB.
+    @gender (str): Male (M), Female (F) or both (X).
+    @return (pandas.Dataframe): The filtered Dataframe with the data needed to plot the map.
+    '''
+    df_map = _lookup_crimes(
+        'df_laender_abs_rel',
+        crime,
+        year = year,
+        age_group = age_group,
+        sexus = gender,
+        columns = ['bundesland', 'schluessel', 'year', 'age_group', 'sexus', 'offenders', 'offenders_rel']
+    )
+    # Translate crime types from german to english (one vectorized mapping of the keys)
+    # assign() returns a new dataframe, so the slice of the table is never written to
+    df_map = df_map.assign(straftat = df_map['schluessel'].map(crime_german_to_english))
+    return df_map
+
+
+def combine_crimes(df, crime, by=('bundesland', 'year', 'age_group', 'sexus')):
+    '''
+    Add up the offenders of all keys of a group of crimes in one grouped pass
+    (the rows of a crime type with one key are returned as they are).
+    The offenders per 100.000 inhabitants can be added up as well, the
+    inhabitants are the same for all crimes. An offender of several crimes
+    of the group is counted once per crime.
+    @df (pandas.Dataframe): Rows of 'df_laender_abs_rel' or 'df_bund_laender_abs_rel'.
+    @crime (list of str): The patterns of the crime type (see pks.py).
+    @by (tuple of str): The columns of a group (one value of the chart).
+    @return (pandas.Dataframe): One row per group with 'schluessel' = crime_group_key(crime).
+    '''
+    if df['schluessel'].nunique() <= 1:
+        return df
+    key = crime_group_key(crime)
+    # The sums can be larger than the compact type of a single value (see compact.py)
+    combined = df.astype({'offenders': 'int64'}).groupby(list(by), sort=False, observed=True, as_index=False)[['offenders', 'offenders_rel']].sum()
+    combined = combined.assign(schluessel = key)
+    if 'straftat' in df.columns:
+        combined = combined.assign(straftat = crime_german_to_english.get(key, key))
+    return combined[list(df.columns)]
+
+
+# The columns added up over the keys of a group of crimes
+SUMMED = ('offenders', 'offenders_rel')
+
+
+def _lookup_crimes(name, crime, columns, **values):
+    '''
+    Get the rows of a crime type with the keys of a group of crimes added up
+    (see _lookup() and combine_crimes()). In query mode the database adds
+    them up (GROUP BY), so only one row per state, year, age group and sex
+    is transferred instead of one per key.
+    @name (str): 'df_laender_abs_rel' or 'df_bund_laender_abs_rel'.
+    @crime (list of str): The patterns of the crime type (see pks.py).
+    @columns (list of str): The columns of the result.
+    @values: The other values to look up (see _lookup()).
+    @return (pandas.Dataframe): One row per group (see combine_crimes()).
+    '''
+    reader = slice_reader
+    if reader is None:
+        return combine_crimes(_lookup(name, columns, schluessel=crime, **values), crime)
+    df = reader(name, columns, dict(values, schluessel=crime), sums=SUMMED)
+    if 'schluessel' in df.columns:
+        # Only one key matched, nothing was added up
+        return df
+    key = crime_group_key(crime)
+    df = df.assign(schluessel = key, offenders = df['offenders'].astype('int64'))
+    if 'straftat' in columns:
+        df = df.assign(straftat = crime_german_to_english.get(key, key))
+    return df[list(columns)]
+
+
+def rank_crimes(df, n=None, by=('bundesland', 'year', 'age_group', 'sexus')):
+    '''
+    Rank the crimes by their share of all crimes: the n largest shares of
+    every group in one vectorized pass (a stable sort and the first n rows
+    of every group). 'other' (all remaining crimes) is not ranked.
+    @df (pandas.Dataframe): Rows of 'df_distribution_crime'.
+    @n (int): The number of crimes per group, by default TOP_N.
+    @by (tuple of str): The columns of a group.
+    @return (pandas.Dataframe): The top n rows of every group, largest share first.
+    '''
+    if n is None:
+        n = TOP_N
+    df = df[~df['schluessel'].isin(['------', 'other'])]
+    df = df.sort_values('certain_crime_percent_of_total_crime', ascending=False, kind='stable')
+    return df.groupby(list(by), sort=False, observed=True).head(n)
+
+
+def _top_crimes(state, year, age_group, gender, n):
+    '''
+    The data of the bar chart with the top crimes of a state (or Germany).
+    '''
+    df = _lookup(
+        'df_distribution_crime',
+        bundesland = state,
+        year = year,
+        age_group = age_group,
+        sexus = gender,
+        columns = ['bundesland', 'year', 'age_group', 'sexus', 'schluessel', 'straftat', 'certain_crime_percent_of_total_crime']
+    )
+    top = rank_crimes(df, n)
+    df_data = pd.DataFrame({
+        'schluessel': top['schluessel'].astype(str).to_numpy(),
+        # Translate crime types from german to english, others keep the first word of their german name
+        'crime_type': top['schluessel'].astype(str).map(crime_german_to_english)
+                          .fillna(top['straftat'].astype(str).str.split(' ').str[0]).to_numpy(),
+        'percentage': top['certain_crime_percent_of_total_crime'].to_numpy(),
+    })
+    return df_data
+
+
+@precomputed
+def get_top_crimes_germany(year, age_group, gender, n=None):
+    '''
+    Create a table from df_distribution_crime to make a bar chart
+    with top crimes of Germany.
+    @year (int): The year for which the top crimes shall be shown.
+    @age_group (str): The age group the chart shall be shown for.
+    @gender (str): The gender from the SQL table.
+    @n (int): The number of crimes, by default TOP_N.
+    @return (pandas.Dataframe): The Dataframe from which to plot the bar chart.
+    '''
+    return _top_crimes('Bundesrepublik Deutschland', year, age_group, gender, n)
+
+
+@precomputed
+def get_top_crimes_federal_states(state, year, age_group, gender, n=None):
+    '''
+    Create a table from df_distribution_crime to make a bar chart
+    with top crimes.
+    @state (str): The federal state for which the chart shall be created.
+    @year (int): The year for which the top crimes shall be shown.
+    @age_group (str): The age group the chart shall be created for.
+    @gender (str): The gender from the SQL table to filter for.
+    @n (int): The number of crimes, by default TOP_N.
+    @return (pandas.Dataframe): The Dataframe from which to plot the bar chart.
+    '''
+    return _top_crimes(state, year, age_group, gender, n)
+
+
+@precomputed
+def get_df_overview_pie(state, year, age_group, gender):
+    '''
+    Create a table from table 'df_distribution_crime' for making a pie chart out of it.
+    @state (str): The federal state (including Germany as a whole).
+    @year (int): The year the pie chart should be filtered to.
+    @age_group (string): The name of the column in the database for the filtered age group.
+    @gender (string): The gender to filter for.
+    @return (pandas.Dataframe): The dataframe to make a pie chart from.
+    '''
+    # Correct entry in dataframe if Germany as whole is selected
+    if state == 'Germany':
+        state = 'Bundesrepublik Deutschland'
+
+    # Make a list of all crimes for the pie chart (without the own groups, they might overlap)
+    crimes = [crime for name, crime in crime_types.items() if name not in crime_groups] #use the global variable
+    crimes = sum(crimes, []) #flatten the list of lists of schluessel
+    crimes.remove('------')
+    crimes.append('other')
+
+    # Filter the dataframe and return only what is needed
+    df_overview_pie = _lookup(
+        'df_distribution_crime',
+        bundesland = state,
+        year = year,
+        age_group = age_group,
+        sexus = gender,
+        schluessel = crimes,
+        columns = [
+            'bundesland',
+            'year',
+            'age_group',
+            'sexus',
+            'schluessel', # =crime_type
+            'straftat', # =crime_type
+            'certain_crime_percent_of_total_crime'
+        ]
+    )
+    # Shorten the names of the crimes
+    # df_overview_pie['straftat'] = df_overview_pie['straftat'].apply(lambda x: x.split(' ')[0])
+
+    # Translate long german crime names to short english names
+    df_overview_pie = df_overview_pie.assign(straftat = df_overview_pie['schluessel'].map(crime_german_to_english))
+    # return the dataframe
+    return df_overview_pie
+
+
+@precomputed
+def get_df_overview_linechart(state, crime_type, age_group, gender):
+    '''
+    Create a table from table 'df_bund_laender_abs_rel' for making a linechart out of it.
+    @state (str): The federal state to show.
+    @crime_type (list of string): The 'schluessel' of different crime types.
+    @age_group (string): The name of the column in the database for the filtered age group.
+    @gender (string): The gender to filter for.
+    @return (pandas.Dataframe): The dataframe to make a linechart from.
+    '''
+    if state == 'Germany':
+        state = 'Bundesrepublik Deutschland' 
+    # Calculate the sum for the crime_type, if there are several 'schluessel'
+    return _lookup_crimes(
+        'df_bund_laender_abs_rel',
+        crime_type,
+        bundesland = state,
+        age_group = age_group,
+        sexus = gender,
+        columns = ['bundesland', 'schluessel', 'straftat', 'year', 'age_group', 'sexus', 'offenders', 'offenders_rel']
+    )
+
+
+def growth_rates(df, by=('bundesland', 'schluessel', 'age_group', 'sexus')):
+    '''
+    The growth of the offenders (absolute) and of the offenders per 100.000
+    inhabitants (relative) in % to the year before, for every group in one
+    vectorized pass. The first year of a group has no growth rate, it is
+    missing (<NA>), as is a growth from 0 offenders.
+    @df (pandas.Dataframe): Rows of 'df_bund_laender_abs_rel'.
+    @by (tuple of str): The columns of a group (one time series).
+    @return (pandas.Dataframe): The columns of the groups and the year with
+        'growth_abs' and 'growth_rel' (Float64), sorted by year.
+    '''
+    df = df.sort_values('year', kind='stable')
+    values = df[['offenders', 'offenders_rel']].astype('float64')
+    previous = values.groupby([df[col] for col in by], sort=False, observed=True).shift()
+    growth = ((values - previous) / previous * 100).round(2)
+    growth = growth.mask(np.isinf(growth)).astype('Float64')
+    return df[list(by) + ['year']].assign(growth_abs = growth['offenders'], growth_rel = growth['offenders_rel'])
+
+
+@precomputed
+def get_df_growth_rate(state, crime_type, year, age_group, gender):
+    '''
+    Compute the growth rates of crime of all years from the table 'df_bund_laender_abs_rel'.
+    @state (str): The federal state (including Germany as a whole).
+    @crime_type (list of string): The 'schluessel' of different crime types.
+    @year (int): The selected year (the growth rates of all years are returned).
+    @age_group (string): The name of the column in the database for the filtered age group.
+    @gender (string): The gender to filter for.
+    @return (pandas.Dataframe): The growth rates ('growth_abs', 'growth_rel') of every year.
+    '''
+    if state == 'Germany':
+        state = 'Bundesrepublik Deutschland'
+
+    df = _lookup_crimes(
+        'df_bund_laender_abs_rel',
+        crime_type,
+        bundesland = state,
+        age_group = age_group,
+        sexus = gender,
+        columns = ['bundesland', 'schluessel', 'year', 'age_group', 'sexus', 'offenders', 'offenders_rel']
+    )
+    return growth_rates(df).reset_index(drop=True)
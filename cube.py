@@ -0,0 +1,290 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Precomputed results of all get_df_* functions.
+#
+# The controls of the dashboard only have a few values
+# (years, states, age groups, crime types, genders), so
+# every get_df_* function can be evaluated for all of them
+# ahead of time. The results are stored in one Arrow IPC
+# file per function together with the position of every
+# result in it. The dashboard then takes a result by its
+# arguments without filtering any table.
+#
+#   python cube.py build    # from the database or, with
+#                           # CRIME_GER_DATA_SOURCE=snapshot, the snapshot
+#
+# The cube carries a fingerprint of the tables, of
+# crime_data.py and of the crime types (with the own
+# groups), so it is rebuilt if one of them changes.
+# -----------------------------------------------------
+
+
+import argparse
+import hashlib
+import inspect
+import itertools
+import json
+import logging
+import numbers
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import crime_data
+
+
+CUBE_DIR = os.environ.get('CRIME_GER_CUBE_DIR', 'data/cube')
+MANIFEST = 'manifest.json'
+
+logger = logging.getLogger(__name__)
+
+
+def selections():
+    '''
+    All arguments the dashboard can call the get_df_* functions with.
+    The growth rates do not depend on the year (all years are shown),
+    so the year is left out of their key (see KEY_ARGUMENTS).
+    The functions on the tables partitioned by year are only evaluated
+    for the loaded years, the others are computed when selected.
+    @return (dict): Name of the function -> list of argument tuples.
+    '''
+    crimes = list(crime_data.crime_types.values())
+    ages = list(crime_data.age_groups.values())
+    genders = list(crime_data.genders.values())
+    states = crime_data.federal_states
+    years = crime_data.years
+    loaded = crime_data.loaded_years()
+    return {
+        'get_df_map': list(itertools.product(crimes, loaded, ages, genders)),
+        'get_top_crimes_germany': list(itertools.product(loaded, ages, genders)),
+        'get_top_crimes_federal_states': list(itertools.product(states[1:], loaded, ages, genders)),
+        'get_df_overview_pie': list(itertools.product(states, loaded, ages, genders)),
+        'get_df_overview_linechart': list(itertools.product(states, crimes, ages, genders)),
+        'get_df_growth_rate': list(itertools.product(states, crimes, [years[-1]], ages, genders)),
+    }
+
+
+# Position of the arguments that make up the key of a result (all, if not listed)
+KEY_ARGUMENTS = {
+    'get_df_growth_rate': [0, 1, 3, 4], # state, crime_type, age_group, gender
+}
+
+
+def key_value(value):
+    '''
+    An argument as plain JSON value: numpy numbers (e.g. a year taken from
+    a dataframe) as int or float, lists of crime keys as lists of str.
+    '''
+    if isinstance(value, (list, tuple)):
+        return [key_value(item) for item in value]
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return float(value)
+    return str(value)
+
+
+def make_key(function, args):
+    '''
+    The key of a result in the cube.
+    @function (str): The name of the get_df_* function.
+    @args (tuple): All arguments of the call, with the defaults (see crime_data.call_arguments()).
+    @return (str): The key.
+    '''
+    positions = KEY_ARGUMENTS.get(function, range(len(args)))
+    return json.dumps([key_value(args[i]) for i in positions], ensure_ascii=False)
+
+
+def fingerprint(dataframes):
+    '''
+    A fingerprint of the loaded tables, of the code computing the results
+    and of the crime types (with the own groups).
+    @dataframes (dict): Name of the dataframe -> pandas.Dataframe.
+    @return (str): The fingerprint (sha1 hex digest).
+    '''
+    sha = hashlib.sha1()
+    sha.update(inspect.getsource(crime_data).encode())
+    sha.update(str(crime_data.TOP_N).encode())
+    # The own groups of crimes are read from CRIME_GER_CRIME_GROUPS, not from the code
+    sha.update(json.dumps(crime_data.crime_types, sort_keys=True, ensure_ascii=False).encode())
+    for name in sorted(dataframes):
+        df = dataframes[name]
+        sha.update(name.encode())
+        sha.update(json.dumps([str(col) for col in df.columns]).encode())
+        sha.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return sha.hexdigest()
+
+
+class Cube:
+    '''
+    The precomputed results of the get_df_* functions.
+    @frames (dict): Name of the function -> all its results in one dataframe.
+    @offsets (dict): Name of the function -> key -> (start, stop) of the result in the frame.
+    @fingerprint (str): The fingerprint of the data the cube was built from.
+    '''
+
+    def __init__(self, frames, offsets, fingerprint):
+        self.frames = frames
+        self.offsets = offsets
+        self.fingerprint = fingerprint
+
+    def get(self, function, args):
+        '''
+        Get a precomputed result.
+        @function (str): The name of the get_df_* function.
+        @args (tuple): All arguments of the call (see crime_data.call_arguments()).
+        @return (pandas.Dataframe): The result or None, if it is not in the cube.
+        '''
+        offsets = self.offsets.get(function)
+        if offsets is None:
+            return None
+        position = offsets.get(make_key(function, args))
+        if position is None:
+            return None
+        return self.frames[function].iloc[position[0]:position[1]]
+
+
+def build(dataframes=None):
+    '''
+    Evaluate all get_df_* functions for all selections.
+    Calls that fail (e.g. because data is missing) are left out,
+    the dashboard then computes them (and shows the error) itself.
+    @dataframes (dict): The tables, by default the ones in crime_data.
+    @return (Cube): The cube.
+    '''
+    if dataframes is not None:
+        crime_data.set_tables(dataframes)
+    dataframes = {name: crime_data.get_table(name) for name in crime_data.table_names()}
+    frames, offsets = {}, {}
+    for function, calls in selections().items():
+        compute = getattr(crime_data, function).__wrapped__
+        results, offsets[function], start = [], {}, 0
+        for args in calls:
+            try:
+                df = compute(*args)
+            except Exception as err:
+                logger.warning("Cube: %s%s failed: %s", function, args, err)
+                continue
+            key = make_key(function, crime_data.call_arguments(compute, args, {}))
+            offsets[function][key] = (start, start + len(df))
+            start += len(df)
+            results.append(df)
+        frames[function] = pd.concat(results) if results else pd.DataFrame()
+    return Cube(frames, offsets, fingerprint(dataframes))
+
+
+def write(cube, directory=CUBE_DIR):
+    '''
+    Write the cube to a directory (one Arrow IPC file per function and a manifest).
+    @cube (Cube): The cube.
+    @directory (str): The cube directory.
+    '''
+    os.makedirs(directory, exist_ok=True)
+    manifest = {'fingerprint': cube.fingerprint, 'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'functions': {}}
+    for function, df in cube.frames.items():
+        file_name = f"{function}.arrow"
+        path = os.path.join(directory, file_name)
+        # Keep the row labels of the results, they point into the original tables
+        feather.write_feather(df.rename_axis('_row').reset_index(), path + '.tmp', compression='uncompressed')
+        os.replace(path + '.tmp', path)
+        manifest['functions'][function] = {'file': file_name, 'offsets': cube.offsets[function]}
+    with open(os.path.join(directory, MANIFEST + '.tmp'), 'w') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(os.path.join(directory, MANIFEST + '.tmp'), os.path.join(directory, MANIFEST))
+
+
+def read(directory=CUBE_DIR, expected_fingerprint=None):
+    '''
+    Read the cube from a directory. The files are memory-mapped.
+    @directory (str): The cube directory.
+    @expected_fingerprint (str): If given, the cube is only returned if it was
+        built from data with this fingerprint.
+    @return (Cube): The cube or None, if there is no (matching) cube.
+    '''
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    if expected_fingerprint is not None and manifest['fingerprint'] != expected_fingerprint:
+        return None
+    frames, offsets = {}, {}
+    for function, entry in manifest['functions'].items():
+        source = pa.memory_map(os.path.join(directory, entry['file']), 'r')
+        df = pa.ipc.open_file(source).read_all().to_pandas()
+        if '_row' in df.columns:
+            df = df.set_index('_row').rename_axis(None)
+        frames[function] = df
+        offsets[function] = {key: tuple(position) for key, position in entry['offsets'].items()}
+    return Cube(frames, offsets, manifest['fingerprint'])
+
+
+def load_or_build(directory=CUBE_DIR, background=True):
+    '''
+    Use the cube for the tables loaded in crime_data.
+    If there is a cube built from the same tables (and the same code),
+    it is used right away. Otherwise a new one is built and written,
+    by default in a background thread, while the dashboard computes
+    the results itself until the new cube is ready.
+    @directory (str): The cube directory.
+    @background (bool): Build a missing cube in a background thread.
+    @return (threading.Thread): The thread building the cube or None.
+    '''
+    dataframes = {name: crime_data.get_table(name) for name in crime_data.table_names()}
+    expected = fingerprint(dataframes)
+    cube = read(directory, expected)
+    if cube is not None:
+        crime_data.cube = cube
+        return None
+
+    def rebuild():
+        start = time.perf_counter()
+        try:
+            cube = build()
+            write(cube, directory)
+        except Exception:
+            logger.exception("Cube: building failed")
+            return
+        # The tables might have been replaced in the meantime
+        if cube.fingerprint == expected:
+            crime_data.cube = cube
+        logger.info("Cube: built in %.1f s", time.perf_counter() - start)
+
+    logger.info("Cube: no cube for the loaded tables in '%s', building it", directory)
+    crime_data.cube = None
+    if not background:
+        rebuild()
+        return None
+    thread = threading.Thread(target=rebuild, name='cube_build', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute the results of all get_df_* functions.')
+    parser.add_argument('command', choices=['build', 'info'], help="'build' loads the tables and builds the cube, 'info' shows the stored cube")
+    parser.add_argument('--dir', default=CUBE_DIR, help=f"cube directory (default: {CUBE_DIR})")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        import source
+        # The same tables (and partitions) as the dashboard loads at start, so their fingerprints match
+        dataframes = source.load()
+        start = time.perf_counter()
+        crime_data.set_tables(dataframes, load_partition=source.load_partition)
+        cube = build()
+        write(cube, args.dir)
+        print(f"Built in {time.perf_counter() - start:.1f} s")
+    cube = read(args.dir)
+    if cube is None:
+        print(f"No cube in '{args.dir}'")
+    else:
+        for function, df in cube.frames.items():
+            print(f"{function:<30} {len(cube.offsets[function]):>6} results {len(df):>8} rows")
+        print(f"fingerprint: {cube.fingerprint}")
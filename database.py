@@ -0,0 +1,290 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Database access for the dashboard.
+#
+# All queries go through one connection pool that lives
+# as long as the Streamlit process, so a rerun or a new
+# session does not open a new connection to Azure.
+# psycopg2 is only imported with the first connection,
+# the offline mode (see snapshot.py) does not need it.
+# -----------------------------------------------------
+
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import streamlit as st
+
+
+# Defaults, can be overwritten in the [azure_db] section of secrets.toml
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 6
+CONNECT_TIMEOUT = 10 # seconds
+POOL_TIMEOUT = 30 # seconds a query waits for a free connection
+
+# Seconds a slice read by read_slice() is cached (query mode, see source.py)
+SLICE_CACHE_TTL = 300
+
+# Tables needed by the dashboard: name of the dataframe -> table in the database
+# (the names of the tables in the database still carry the years of the first export,
+# the years of the dashboard are taken from the data, see crime_data.set_tables())
+TABLES = {
+    'df_distribution_crime': 'df_distribution_crime_2022_until_2018',
+    'df_laender_abs_rel': 'df_laender_abs_rel_2022_until_2018',
+    'df_bund_laender_abs_rel': 'df_bund_laender_abs_rel_2022_until_2018',
+}
+
+logger = logging.getLogger(__name__)
+
+
+class TableLoadError(Exception):
+    '''
+    Raised by load_tables() if at least one table could not be loaded.
+    @errors (dict): Name of the dataframe -> the exception raised while loading it.
+    @report (list of dict): The timing report of all tables (see load_tables()).
+    '''
+    def __init__(self, errors, report):
+        self.errors = errors
+        self.report = report
+        super().__init__('Could not load: ' + ', '.join(f"{name} ({err})" for name, err in errors.items()))
+
+
+class BlockingPool:
+    '''
+    A connection pool whose getconn() waits for a free connection.
+    psycopg2's ThreadedConnectionPool raises PoolError as soon as all maxconn
+    connections are in use, but the pool is shared by all sessions, the
+    threads of the API and the queries of query mode. A semaphore with
+    maxconn slots lets the further callers queue instead.
+    @pool (psycopg2.pool.ThreadedConnectionPool): The pool of the connections.
+    @timeout (float): Seconds to wait for a free connection.
+    '''
+
+    def __init__(self, pool, timeout=POOL_TIMEOUT):
+        self.pool = pool
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(pool.maxconn)
+
+    def getconn(self):
+        '''
+        Borrow a connection, waiting until one is free.
+        @return (psycopg2.extensions.connection): The connection.
+        @raise psycopg2.pool.PoolError: If no connection got free in time.
+        '''
+        from psycopg2.pool import PoolError
+        if not self.slots.acquire(timeout=self.timeout):
+            raise PoolError(f"no free connection in the pool after {self.timeout} s")
+        try:
+            return self.pool.getconn()
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def putconn(self, con, close=False):
+        '''
+        Give a connection back (close it, if it is broken).
+        @con (psycopg2.extensions.connection): The borrowed connection.
+        @close (bool): Close the connection instead of keeping it in the pool.
+        '''
+        try:
+            self.pool.putconn(con, close=close)
+        finally:
+            self.slots.release()
+
+
+@st.cache_resource
+def get_connection_pool():
+    '''
+    Create the connection pool to the Postgres database on Azure.
+    It is created only once per process (st.cache_resource) and
+    shared by all sessions and threads.
+    The credentials and the optional settings 'pool_min_size',
+    'pool_max_size', 'pool_timeout' and 'connect_timeout' are loaded
+    from the internal service offered by Streamlit to protect secrets.
+    @return (BlockingPool): The connection pool.
+    '''
+    from psycopg2 import pool
+    db = st.secrets.azure_db
+    return BlockingPool(pool.ThreadedConnectionPool(
+        minconn = int(db.get('pool_min_size', POOL_MIN_SIZE)),
+        maxconn = int(db.get('pool_max_size', POOL_MAX_SIZE)),
+        host = db['host'],
+        port = db['port'],
+        database = db['database'],
+        user = db['user'],
+        password = db['password'],
+        connect_timeout = int(db.get('connect_timeout', CONNECT_TIMEOUT)),
+        # Detect connections silently dropped by Azure while idle in the pool
+        keepalives = 1,
+        keepalives_idle = 60,
+    ), timeout=float(db.get('pool_timeout', POOL_TIMEOUT)))
+
+
+def read_dataframe(query, params=None):
+    '''
+    Run a query on a pooled connection and return the result
+    as a pandas dataframe.
+    The query is executed once and the rows are fetched in a
+    single round trip straight into the dataframe (decimals as floats).
+    If the borrowed connection turns out to be dead (e.g. closed
+    by the server while idle), it is thrown away and the query
+    is tried once more on a fresh connection. If all connections
+    are in use, it waits for a free one (see BlockingPool).
+    @query (str): The SQL query.
+    @params (tuple or dict): Optional parameters for the query.
+    @return (pandas.Dataframe): The result of the query.
+    '''
+    import psycopg2
+    con_pool = get_connection_pool()
+    for attempt in range(2):
+        con = con_pool.getconn()
+        try:
+            # Read-only autocommit: no BEGIN/COMMIT round trips, nothing left open in the pool
+            if not con.autocommit:
+                con.set_session(readonly=True, autocommit=True)
+            with con.cursor() as cur:
+                cur.execute(query, params)
+                columns = [col.name for col in cur.description]
+                # NUMERIC columns arrive as decimal.Decimal, read_sql() made them floats as well
+                df = pd.DataFrame.from_records(cur.fetchall(), columns=columns, coerce_float=True)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            con_pool.putconn(con, close=True)
+            if attempt == 1:
+                raise
+        except Exception:
+            con_pool.putconn(con)
+            raise
+        else:
+            con_pool.putconn(con)
+            return df
+
+
+def table_fingerprints(tables=TABLES):
+    '''
+    Get a cheap fingerprint of every table: the number of rows, the
+    latest year and a checksum over all rows. They are computed by
+    the database in one query, only the fingerprints are transferred.
+    If a fingerprint changes, the table has to be loaded again.
+    @tables (dict): Name of the dataframe -> table in the database.
+    @return (dict): Name of the dataframe -> fingerprint (str).
+    '''
+    query = ' UNION ALL '.join(
+        f"SELECT %s AS name, count(*) AS row_count, max(t.year) AS max_year, sum(hashtext(t::text)::bigint) AS checksum FROM public.{table} AS t"
+        for table in tables.values()
+    ) + ';'
+    df = read_dataframe(query, tuple(tables))
+    return {row.name: f"{row.row_count}:{row.max_year}:{row.checksum}" for row in df.itertuples(index=False)}
+
+
+def load_tables(tables=TABLES, max_workers=None, recent_years=None, partitioned=()):
+    '''
+    Load several tables from the database at the same time.
+    Every table is fetched in its own thread with a connection
+    from the pool, so the loading time is the time of the slowest
+    table and not the sum of all tables.
+    The time, number of rows and error (if any) of every table is
+    written to the log.
+    @tables (dict): Name of the dataframe -> table in the database.
+    @max_workers (int): Number of threads, defaults to one per table.
+    @recent_years (int): Of the partitioned tables only load the latest years (default: all).
+    @partitioned (list of str): The dataframes partitioned by year (see crime_data.YEAR_PARTITIONED).
+    @return (dict, list of dict): The dataframes by name and the report
+        with one entry {'table', 'seconds', 'rows', 'error'} per table.
+    @raise TableLoadError: If at least one of the tables could not be loaded.
+    '''
+    def load(name):
+        start = time.perf_counter()
+        try:
+            if recent_years and name in partitioned:
+                df = read_dataframe(
+                    f"SELECT * FROM public.{tables[name]} WHERE year > (SELECT max(year) FROM public.{tables[name]}) - %s;",
+                    (recent_years,)
+                )
+            else:
+                df = read_dataframe(f"SELECT * FROM public.{tables[name]};")
+        except Exception as err:
+            return name, None, {'table': name, 'seconds': time.perf_counter() - start, 'rows': 0, 'error': err}
+        return name, df, {'table': name, 'seconds': time.perf_counter() - start, 'rows': len(df), 'error': None}
+
+    start = time.perf_counter()
+    dataframes, report, errors = {}, [], {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(tables), thread_name_prefix='load_tables') as executor:
+        for name, df, entry in executor.map(load, tables):
+            report.append(entry)
+            if entry['error'] is None:
+                dataframes[name] = df
+                logger.info("Loaded %s: %d rows in %.3f s", name, entry['rows'], entry['seconds'])
+            else:
+                errors[name] = entry['error']
+                logger.error("Loading %s failed after %.3f s: %s", name, entry['seconds'], entry['error'])
+    logger.info("Loaded %d of %d tables in %.3f s", len(dataframes), len(tables), time.perf_counter() - start)
+    if errors:
+        raise TableLoadError(errors, report)
+    return dataframes, report
+
+
+def load_partition(name, year, tables=TABLES):
+    '''
+    Load the rows of one year of a table.
+    @name (str): The name of the dataframe, e.g. 'df_laender_abs_rel'.
+    @year (int): The year.
+    @tables (dict): Name of the dataframe -> table in the database.
+    @return (pandas.Dataframe): The rows of the year.
+    '''
+    start = time.perf_counter()
+    df = read_dataframe(f"SELECT * FROM public.{tables[name]} WHERE year = %s;", (year,))
+    logger.info("Loaded %s for %d: %d rows in %.3f s", name, year, len(df), time.perf_counter() - start)
+    return df
+
+
+@st.cache_data(ttl=SLICE_CACHE_TTL, max_entries=4096, show_spinner=False)
+def read_slice(table, columns, filters, sums=()):
+    '''
+    Read only the rows and columns of a table that a chart needs.
+    The values are passed as query parameters, the database filters
+    the table and only the matching rows are transferred. With sums
+    the database also adds up the rows (GROUP BY the other columns),
+    e.g. the offenders of all keys of a group of crimes, so only one
+    row per group is transferred. The result is cached for every
+    combination of arguments.
+    @table (str): The table in the database.
+    @columns (tuple of str): The columns to read, None for all.
+    @filters (tuple): Pairs of (column, tuple of values), a row matches
+        if each of the columns has one of its values (all rows, if empty).
+    @sums (tuple of str): Columns to add up, the other columns are the groups.
+    @return (pandas.Dataframe): The matching rows (with sums: one per group).
+    '''
+    groups = [col for col in columns or () if col not in sums]
+    select = ', '.join(groups + [f"sum({col}) AS {col}" for col in sums]) or '*'
+    query = f"SELECT {select} FROM public.{table}"
+    if filters:
+        query += ' WHERE ' + ' AND '.join(f"{col} = ANY(%s)" for col, values in filters)
+    if sums and groups:
+        query += ' GROUP BY ' + ', '.join(groups)
+    df = read_dataframe(query + ';', tuple(list(values) for col, values in filters))
+    return df[list(columns)] if sums else df
+
+
+@st.cache_data(ttl=SLICE_CACHE_TTL, show_spinner=False)
+def distinct_values(table, column):
+    '''
+    Read the distinct values of a column of a table (cached like the slices).
+    @table (str): The table in the database.
+    @column (str): The column, e.g. 'schluessel'.
+    @return (tuple): The values, sorted.
+    '''
+    df = read_dataframe(f"SELECT DISTINCT {column} FROM public.{table} ORDER BY {column};")
+    return tuple(df[column])
+
+
+def available_years(tables=TABLES):
+    '''
+    Get the years in the data (of the time series table, which has all years).
+    @tables (dict): Name of the dataframe -> table in the database.
+    @return (list of int): The years.
+    '''
+    df = read_dataframe(f"SELECT DISTINCT year FROM public.{tables['df_bund_laender_abs_rel']} ORDER BY year;")
+    return [int(year) for year in df['year']]
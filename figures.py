@@ -0,0 +1,234 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# The Plotly figures of the dashboard and a cache for them.
+#
+# Building a figure with Plotly Express takes most of the
+# time of a rerun. The built figures are kept in a cache
+# (see lru.py), keyed by the values of the controls every
+# figure depends on. Plotly is only imported when the first
+# figure is built.
+# -----------------------------------------------------
+
+
+import hashlib
+import json
+
+import pandas as pd
+
+import lru
+
+
+# ---------------------------------
+# Figures
+# ---------------------------------
+
+def map_figure(df, color_column, geo_data, zoom):
+    '''
+    Create the map with the offenders in every federal state.
+    @df (pandas.Dataframe): The data from get_df_map().
+    @color_column (str): 'offenders_rel' or 'offenders'.
+    @geo_data (dict): The GeoJSON of the federal states.
+    @zoom (float): The zoom of the map.
+    @return (plotly.graph_objects.Figure): The map.
+    '''
+    import plotly.express as px
+    fig = px.choropleth_mapbox(
+        df,
+        locations = 'bundesland', #column in dataframe
+        geojson = geo_data, #geodata in geoJSON format
+        featureidkey = 'properties.NAME_1', #key that merges to dataframe
+        hover_name = 'bundesland',
+        color = color_column,
+        hover_data = {'schluessel': False,
+                      'straftat': True,
+                      'bundesland': False,
+                      'year': False,
+                      'age_group': False,
+                      'sexus': False,
+                      'offenders': True,
+                      'offenders_rel': True,
+        },
+        labels = {
+                'straftat': 'Crime',
+                # 'year': 'Year',
+                'offenders': 'Offenders absolute',
+                'offenders_rel': 'Offenders per 100,000 residents',
+        },
+        zoom=zoom,
+        height=550,
+        # width=600,
+        opacity=0.4,
+    )
+    fig.update_layout(
+        mapbox_style='carto-positron',
+        margin=dict(l=0, t=0, r=0, b=0),
+        coloraxis_colorbar_title_text = '', #setzt einen Titel über der colorleiste am Rand
+    )
+    fig.update_mapboxes(center=dict(lat=51.4, lon=10.5)) #Flinsberg, middle of Germany
+    fig.update_coloraxes(showscale=True)
+    return fig
+
+
+def top_crimes_figure(df):
+    '''
+    Create the bar chart with the top crimes.
+    @df (pandas.Dataframe): The data from get_top_crimes_germany() or get_top_crimes_federal_states().
+    @return (plotly.graph_objects.Figure): The bar chart.
+    '''
+    import plotly.express as px
+    fig = px.bar(df,
+                 x='crime_type',
+                 y='percentage',
+                 height = 360,
+                 text = 'percentage', #show values in chart
+                 labels = {
+                   'crime_type': 'Crime',
+                   'percentage': 'Percentage'
+                 },
+                 hover_name = 'crime_type',
+                 hover_data = {
+                     'crime_type': False,
+                     'percentage': True
+                 }
+    )
+    fig.update_xaxes(tickangle=-45)
+    fig.update_xaxes(type='category')
+    fig.update_layout(
+        xaxis_title = '',
+        yaxis_title = 'Percentage',
+    )
+    return fig
+
+
+def crime_types_figure(df):
+    '''
+    Create the pie chart with the distribution of the types of crime.
+    @df (pandas.Dataframe): The data from get_df_overview_pie().
+    @return (plotly.graph_objects.Figure): The pie chart.
+    '''
+    import plotly.express as px
+    fig = px.pie(
+        df,
+        values='certain_crime_percent_of_total_crime',
+        labels = {'certain_crime_percent_of_total_crime': 'Percent of total crime',
+                  'straftat': 'Crime'},
+        names='straftat',
+        height = 450,
+
+    )
+    # fig.update_layout(
+    #     showlegend=True,
+    #     margin=dict(l=0, t=10, r=0, b=0),
+    #     legend=dict(
+    #         yanchor="bottom",
+    #         y=-0.8,
+    #         xanchor="left",
+    #         x=0
+    #     ),
+    # )
+    fig.update_traces(
+        textposition = 'inside',
+        # textinfo = 'label+value'
+        textinfo = 'label+percent'
+    )
+    return fig
+
+
+def years_figure(df, column, yaxis_title):
+    '''
+    Create a line chart with the offenders over the years.
+    @df (pandas.Dataframe): The data from get_df_overview_linechart().
+    @column (str): 'offenders' or 'offenders_rel'.
+    @yaxis_title (str): The title of the y-axis.
+    @return (plotly.graph_objects.Figure): The line chart.
+    '''
+    import plotly.express as px
+    fig = px.line(
+        df,
+        x='year',
+        y=column,
+        markers=True,
+    )
+    fig.update_xaxes(type='category') #set to categorical datatype so that on x-axis no in between values are calculated by plotly
+    fig.update_layout(margin = dict(l=0, t=25, r=0, b=0), height=250)
+    fig.update_layout(
+        xaxis_title = 'Year',
+        yaxis_title = yaxis_title
+    )
+    fig.update_traces(line_color="#1a60bc")
+    return fig
+
+
+# ---------------------------------
+# Map without geometry
+# (for the map component, see mapview.py)
+# ---------------------------------
+
+# The values of the map change with the controls, everything else of the trace is in the base
+MAP_VALUE_KEYS = ['customdata', 'geojson', 'hovertemplate', 'hovertext', 'locations', 'z']
+
+# Hover of the map component, the customdata is [crime, offenders, offenders_rel]
+MAP_HOVER = {
+    'offenders_rel': '<b>%{hovertext}</b><br><br>Crime=%{customdata[0]}<br>Offenders absolute=%{customdata[1]}<br>Offenders per 100,000 residents=%{z}<extra></extra>',
+    'offenders': '<b>%{hovertext}</b><br><br>Crime=%{customdata[0]}<br>Offenders absolute=%{z}<br>Offenders per 100,000 residents=%{customdata[2]}<extra></extra>',
+}
+
+
+def map_base(geo_data, zoom):
+    '''
+    Everything of the map that does not change with the controls: the
+    geometry, the layout and the style of the trace (taken from an empty
+    map_figure(), so both maps look the same) and the order of the states.
+    It is sent to the browser once per session.
+    @geo_data (dict): The GeoJSON of the federal states.
+    @zoom (float): The zoom of the map.
+    @return (dict): 'id' (hash of the base), 'geojson', 'layout', 'trace', 'hovertemplates' and 'states'.
+    '''
+    import plotly.io as pio
+    empty = pd.DataFrame({column: [] for column in ['bundesland', 'schluessel', 'straftat', 'year', 'age_group', 'sexus', 'offenders', 'offenders_rel']})
+    fig = json.loads(pio.to_json(map_figure(empty, 'offenders_rel', {}, zoom), validate=False))
+    base = {
+        'geojson': geo_data,
+        'layout': fig['layout'],
+        'trace': {key: value for key, value in fig['data'][0].items() if key not in MAP_VALUE_KEYS},
+        'hovertemplates': MAP_HOVER,
+        'states': [feature['properties']['NAME_1'] for feature in geo_data['features']],
+    }
+    base['id'] = hashlib.sha1(json.dumps(base, sort_keys=True).encode()).hexdigest()[:16]
+    return base
+
+
+def map_values(df, color_column, states):
+    '''
+    The values of the map for one selection, in the order of the states of the base.
+    @df (pandas.Dataframe): The data from get_df_map().
+    @color_column (str): 'offenders_rel' or 'offenders'.
+    @states (list of str): The states of map_base().
+    @return (dict): 'color', 'crime', 'offenders' and 'offenders_rel' (None for a missing state).
+    '''
+    df = df.assign(bundesland=df['bundesland'].astype(str)).drop_duplicates('bundesland').set_index('bundesland').reindex(states)
+    return {
+        'color': color_column,
+        'crime': str(df['straftat'].dropna().iloc[0]) if df['straftat'].notna().any() else '',
+        'offenders': [None if pd.isna(value) else int(value) for value in df['offenders']],
+        'offenders_rel': [None if pd.isna(value) else float(value) for value in df['offenders_rel']],
+    }
+
+
+# ---------------------------------
+# Cache
+# ---------------------------------
+
+class FigureCache(lru.BoundedCache):
+    '''
+    The cache of the built figures (see lru.BoundedCache).
+    The figures are kept as built Figure objects and must not be
+    changed after they were put into the cache: handing a serialized
+    figure to st.plotly_chart would validate it again, which costs
+    nearly as much as building it.
+    @max_entries (int): The maximal number of figures in the cache.
+    @report_every (int): Write the hit and miss counts to the log every n lookups.
+    '''
+
+    def __init__(self, max_entries=64, report_every=100):
+        super().__init__(max_entries, report_every, name='Figure cache')
@@ -0,0 +1,226 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Simplified geodata of the federal states for the map.
+#
+# The full resolution polygons are far more detailed than
+# the map can show at its zoom level. This preprocessing
+# step writes simplified versions for some levels of detail:
+#
+#   python geodata.py
+#
+# The borders between two states are simplified only once
+# and used by both states, so no gaps or overlaps appear
+# between neighbours (topology is preserved).
+# -----------------------------------------------------
+
+
+import argparse
+import json
+import math
+import os
+
+
+SOURCE_FILE = 'data/bundeslaender_polygons.json'
+
+# Level of detail -> tolerance of the simplification and decimals of the coordinates (in degrees)
+LEVELS = {
+    'low': {'tolerance': 0.01, 'decimals': 2},
+    'medium': {'tolerance': 0.0025, 'decimals': 3},
+    'high': {'tolerance': 0.0005, 'decimals': 4},
+}
+
+# Properties of the features needed by the map (featureidkey = 'properties.NAME_1')
+KEEP_PROPERTIES = ['NAME_1']
+
+# Longitude degrees are shorter than latitude degrees in Germany (cos of ~51°)
+LON_SCALE = math.cos(math.radians(51.2))
+
+
+def level_file(level, directory='data'):
+    '''
+    Get the file of the simplified geodata for a level of detail.
+    @level (str): One of the keys of LEVELS.
+    @directory (str): The directory of the geodata.
+    @return (str): The path of the file.
+    '''
+    return os.path.join(directory, f"bundeslaender_polygons_{level}.json")
+
+
+def level_for_zoom(zoom):
+    '''
+    Choose the level of detail for a zoom level of the map.
+    The coarsest level is taken whose tolerance is not larger
+    than a quarter of a pixel (so also on high resolution screens
+    the simplification cannot be seen).
+    @zoom (float): The zoom of the mapbox map, e.g. 4.8.
+    @return (str): The level of detail, one of the keys of LEVELS.
+    '''
+    degrees_per_pixel = 360 / (256 * 2 ** zoom)
+    for level, settings in sorted(LEVELS.items(), key=lambda item: -item[1]['tolerance']):
+        if settings['tolerance'] <= degrees_per_pixel / 4:
+            return level
+    return min(LEVELS, key=lambda level: LEVELS[level]['tolerance'])
+
+
+def _distance(point, start, end):
+    '''
+    Distance of a point to the line segment between start and end.
+    '''
+    px, py = point[0] * LON_SCALE, point[1]
+    ax, ay = start[0] * LON_SCALE, start[1]
+    bx, by = end[0] * LON_SCALE, end[1]
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0, min(1, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+def _douglas_peucker(points, tolerance):
+    '''
+    Simplify a line with the Douglas-Peucker algorithm.
+    The first and the last point are always kept.
+    '''
+    if len(points) < 3:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_dist, index = 0, None
+        for i in range(first + 1, last):
+            dist = _distance(points[i], points[first], points[last])
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index is not None and max_dist > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def _ring_area(ring):
+    '''
+    Area of a ring (shoelace formula) in square degrees.
+    '''
+    return abs(sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(ring, ring[1:]))) / 2
+
+
+def simplify(geo_data, tolerance, decimals):
+    '''
+    Simplify the polygons of a GeoJSON FeatureCollection.
+    The coordinates are rounded to some decimals, the rings are split
+    at every point where the neighbouring states change, and every
+    such piece of border is simplified once for all states sharing it.
+    Parts of a state (e.g. small islands) that collapse are dropped,
+    the largest part of every state is always kept.
+    @geo_data (dict): The GeoJSON with Polygon or MultiPolygon features.
+    @tolerance (float): Maximal deviation from the original border in degrees.
+    @decimals (int): Decimals of the coordinates.
+    @return (dict): The simplified GeoJSON (only KEEP_PROPERTIES are kept).
+    '''
+    # Rounded rings of every feature: list (features) of list (polygons) of list (rings) of points
+    features = []
+    for feature in geo_data['features']:
+        geometry = feature['geometry']
+        polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+        rounded = []
+        for polygon in polygons:
+            rings = []
+            for ring in polygon:
+                points = []
+                for x, y in (coord[:2] for coord in ring):
+                    point = (round(x, decimals), round(y, decimals))
+                    if not points or points[-1] != point:
+                        points.append(point)
+                if points[0] == points[-1]:
+                    points.pop()
+                rings.append(points)
+            rounded.append(rings)
+        features.append(rounded)
+
+    # Which states use a point
+    used_by = {}
+    for number, polygons in enumerate(features):
+        for rings in polygons:
+            for ring in rings:
+                for point in ring:
+                    used_by.setdefault(point, set()).add(number)
+
+    simplified_pieces = {}
+
+    def simplify_ring(ring):
+        n = len(ring)
+        if n < 3:
+            return None
+        # Points where the neighbours change can not be moved
+        fixed = [i for i in range(n) if used_by[ring[i]] != used_by[ring[i - 1]] or used_by[ring[i]] != used_by[ring[(i + 1) % n]]]
+        if not fixed:
+            # Ring without junctions (island or completely enclosed state): choose
+            # two points every state sharing this ring would choose as well
+            start = ring.index(min(ring))
+            far = max(range(n), key=lambda i: (ring[i][0] - ring[start][0]) ** 2 + (ring[i][1] - ring[start][1]) ** 2)
+            fixed = sorted({start, far})
+        result = []
+        for k, first in enumerate(fixed):
+            last = fixed[(k + 1) % len(fixed)]
+            piece = ring[first:last + 1] if last > first else ring[first:] + ring[:last + 1]
+            # Simplify a piece of border in one direction only, so both neighbours get the same result
+            key = min(tuple(piece), tuple(reversed(piece)))
+            if key not in simplified_pieces:
+                simplified_pieces[key] = _douglas_peucker(key, tolerance)
+            simple = simplified_pieces[key]
+            if key != tuple(piece):
+                simple = list(reversed(simple))
+            result.extend(simple[:-1])
+        result.append(result[0])
+        return [list(point) for point in result] if len(result) >= 4 else None
+
+    out_features = []
+    for feature, polygons in zip(geo_data['features'], features):
+        largest = max(range(len(polygons)), key=lambda i: _ring_area(polygons[i][0] + polygons[i][0][:1]))
+        out_polygons = []
+        for number, rings in enumerate(polygons):
+            exterior = simplify_ring(rings[0])
+            if exterior is None or (number != largest and _ring_area(exterior) < tolerance ** 2):
+                if number != largest:
+                    continue
+                exterior = [list(point) for point in rings[0] + rings[0][:1]]
+            holes = [hole for hole in (simplify_ring(ring) for ring in rings[1:]) if hole is not None]
+            out_polygons.append([exterior] + holes)
+        out_features.append({
+            'type': 'Feature',
+            'properties': {key: feature['properties'][key] for key in KEEP_PROPERTIES},
+            'geometry': {'type': 'MultiPolygon', 'coordinates': out_polygons},
+        })
+    return {'type': 'FeatureCollection', 'features': out_features}
+
+
+def write_levels(source_file=SOURCE_FILE, directory='data'):
+    '''
+    Write the simplified geodata for all levels of detail.
+    @source_file (str): The full resolution GeoJSON.
+    @directory (str): Where to write the files to.
+    @return (dict): Level -> size of the written file in bytes.
+    '''
+    with open(source_file) as f:
+        geo_data = json.load(f)
+    sizes = {}
+    for level, settings in LEVELS.items():
+        path = level_file(level, directory)
+        with open(path, 'w') as f:
+            json.dump(simplify(geo_data, **settings), f, separators=(',', ':'), ensure_ascii=False)
+        sizes[level] = os.path.getsize(path)
+    return sizes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write simplified geodata of the federal states for the map.')
+    parser.add_argument('--source', default=SOURCE_FILE, help=f"full resolution GeoJSON (default: {SOURCE_FILE})")
+    parser.add_argument('--dir', default='data', help='output directory (default: data)')
+    args = parser.parse_args()
+
+    print(f"{os.path.basename(args.source)}: {os.path.getsize(args.source):>9} bytes")
+    for level, size in write_levels(args.source, args.dir).items():
+        print(f"{os.path.basename(level_file(level, args.dir))}: {size:>9} bytes")
@@ -0,0 +1,141 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Import time of the scripts of the dashboard.
+#
+# Runs the imports at the top of every script (app.py,
+# the pages, api.py, report.py, ...) in a new Python
+# process with `python -X importtime` and shows how long
+# they take and which of the heavy packages (pandas,
+# Plotly, psycopg2, ...) they pull in. This is the cost of
+# a cold start of a new process before the first run:
+#
+#   python importtime.py
+#   python importtime.py pages/impressum_de.py --top 10
+# -----------------------------------------------------
+
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+# Scripts started by Streamlit or from the command line
+TARGETS = ['app.py', 'pages/impressum_de.py', 'pages/impressum_en.py', 'api.py', 'report.py', 'cube.py', 'snapshot.py']
+
+# Packages that take long to import
+HEAVY = ['streamlit', 'pandas', 'numpy', 'pyarrow', 'plotly', 'plotly.express', 'psycopg2', 'geopandas', 'streamlit_extras']
+
+
+def import_statements(path):
+    '''
+    The imports at the top level of a script (not the ones inside of functions).
+    @path (str): The script.
+    @return (str): The import statements as code.
+    '''
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    return '\n'.join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def parse(output):
+    '''
+    Read the output of -X importtime.
+    @output (str): The lines written to stderr.
+    @return (list of tuple): (depth, module, cumulative seconds) in the order of the output.
+    '''
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((depth, name.strip(), int(cumulative) / 1e6))
+    return modules
+
+
+def run_code(code):
+    '''
+    Run code in a new process with -X importtime.
+    @code (str): The code.
+    @return (list of tuple): The imported modules (see parse()).
+    @raise RuntimeError: If an import fails.
+    '''
+    root = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=root, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return parse(result.stderr)
+
+
+def measure(path):
+    '''
+    Run the imports of a script in a new process, without
+    the modules Python imports at start (site, encodings, ...).
+    @path (str): The script.
+    @return (list of tuple): The imported modules (see parse()).
+    @raise RuntimeError: If an import fails.
+    '''
+    startup = {name for depth, name, seconds in run_code('pass') if depth == 0}
+    try:
+        modules = run_code(import_statements(path))
+    except RuntimeError as err:
+        raise RuntimeError(f"{path}: {err}")
+    return [module for module in modules if not (module[0] == 0 and module[1] in startup)]
+
+
+def report(path, repeat):
+    '''
+    Measure a script several times and take the median.
+    @path (str): The script.
+    @repeat (int): The number of measurements.
+    @return (dict): 'total' (seconds), 'heavy' (package -> seconds, None if not imported)
+        and 'top' (module -> seconds of the imports made by the script itself).
+    '''
+    runs = [measure(path) for _ in range(repeat)]
+    def median(values):
+        return statistics.median(values) if values else None
+    # Python lists a module below the import that first needed it, depth 0 are the imports of the script
+    totals = [sum(seconds for depth, name, seconds in modules if depth == 0) for modules in runs]
+    heavy = {package: median([next(seconds for depth, name, seconds in modules if name == package)
+                              for modules in runs if any(name == package for depth, name, seconds in modules)])
+             for package in HEAVY}
+    top = {}
+    for modules in runs:
+        for depth, name, seconds in modules:
+            if depth == 0:
+                top.setdefault(name, []).append(seconds)
+    return {
+        'total': median(totals),
+        'heavy': heavy,
+        'top': dict(sorted(((name, median(values)) for name, values in top.items()), key=lambda item: -item[1])),
+    }
+
+
+def print_report(results, top):
+    print(f"{'script':<24} {'total ms':>9}  heavy packages imported (ms)")
+    for path, result in results.items():
+        heavy = ', '.join(f"{package} {1000 * seconds:.0f}" for package, seconds in result['heavy'].items() if seconds is not None)
+        print(f"{path:<24} {1000 * result['total']:>9.0f}  {heavy or '-'}")
+        if top:
+            for name, seconds in list(result['top'].items())[:top]:
+                print(f"{'':<26}{name:<30} {1000 * seconds:>7.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import time of the scripts of the dashboard.')
+    parser.add_argument('scripts', nargs='*', default=TARGETS, help='scripts to measure (default: the scripts of the dashboard)')
+    parser.add_argument('--repeat', type=int, default=3, help='measurements of every script, the median is taken (default: 3)')
+    parser.add_argument('--top', type=int, default=0, help='also show the slowest imports of every script')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    results = {path: report(path, args.repeat) for path in args.scripts}
+    print_report(results, args.top)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
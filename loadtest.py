@@ -0,0 +1,352 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Load test of one Streamlit server with concurrent sessions.
+#
+# app.py is started with `streamlit run` against the local
+# snapshot (offline mode, see snapshot.py), or a running
+# server is used. Sessions connect over the websocket of
+# Streamlit like browsers do and play the sequences of
+# control changes of benchmark.py. For every number of
+# concurrent sessions the latency of the reruns (from the
+# change of a control until the run finished), the reruns
+# per second and the CPU and memory of the server process
+# are reported:
+#
+#   python loadtest.py --sessions 1 2 4 8 16
+#   python loadtest.py --url http://127.0.0.1:8501 --pid 1234
+#
+# Needs the websockets package (pip install websockets).
+# The CPU and memory are read from /proc (Linux).
+# -----------------------------------------------------
+
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+import benchmark
+
+
+LOAD_PORT = 8510
+
+# Kinds of the controls played by the sequences
+WIDGETS = ('slider', 'selectbox', 'radio', 'button')
+
+# Seconds between two readings of the server process
+SAMPLE_INTERVAL = 0.25
+
+
+# ---------------------------------
+# Server
+# ---------------------------------
+
+def start_server(port, snapshot):
+    '''
+    Start the dashboard in a new process, reading the snapshot.
+    @port (int): The port of the server.
+    @snapshot (str): The snapshot directory.
+    @return (subprocess.Popen): The process of the server.
+    '''
+    env = dict(os.environ, CRIME_GER_DATA_SOURCE='snapshot', CRIME_GER_SNAPSHOT_DIR=os.path.abspath(snapshot))
+    command = [sys.executable, '-m', 'streamlit', 'run', 'app.py',
+               '--server.headless', 'true', '--server.port', str(port), '--browser.gatherUsageStats', 'false']
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(url, timeout=120):
+    '''
+    Wait until the server answers its health check.
+    @url (str): The address of the server, e.g. 'http://127.0.0.1:8510'.
+    @timeout (float): Seconds to wait at most.
+    @raise RuntimeError: If the server is not ready in time.
+    '''
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + '/_stcore/health', timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"The server on {url} is not ready after {timeout} s")
+
+
+def process_stats(pid):
+    '''
+    The CPU time and memory of a process (Linux).
+    @pid (int): The id of the process.
+    @return (float, int): Seconds of CPU (user and system) and resident memory in bytes,
+        None if the process can not be read.
+    '''
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # The fields after the name of the process (which can contain spaces)
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmRSS:'))
+    except (OSError, StopIteration):
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK'), rss
+
+
+# ---------------------------------
+# Sessions
+# ---------------------------------
+
+class Session:
+    '''
+    One session of the dashboard over the websocket of Streamlit, like a browser.
+    @websocket: The open connection to /_stcore/stream.
+    '''
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        # Key (or label) of a control -> (kind, id, fragment id), taken from the elements sent
+        self.widgets = {}
+        # Id of a control -> WidgetState, the values the session changed
+        self.states = {}
+        # Hashes of the cacheable messages received, the server only refers to them again
+        self.hashes = set()
+        self.received_bytes = 0
+        self.errors = 0
+
+    def read_delta(self, delta):
+        '''
+        Remember the controls of the dashboard and count the exceptions of the app.
+        @delta (Delta): A delta of the page.
+        '''
+        if delta.WhichOneof('type') != 'new_element':
+            return
+        kind = delta.new_element.WhichOneof('type')
+        if kind == 'exception':
+            self.errors += 1
+        elif kind in WIDGETS:
+            proto = getattr(delta.new_element, kind)
+            # The id of a control with a key ends with the key
+            key = proto.id.rsplit('-', 1)[-1]
+            for name in (proto.label,) if key == 'None' else (key, proto.label):
+                self.widgets[name] = (kind, proto.id, delta.fragment_id)
+
+    async def receive_run(self):
+        '''
+        Read the messages of the server until the run finished.
+        '''
+        while True:
+            data = await self.websocket.recv()
+            self.received_bytes += len(data)
+            msg = ForwardMsg()
+            msg.ParseFromString(data)
+            if msg.metadata.cacheable:
+                self.hashes.add(msg.hash)
+            kind = msg.WhichOneof('type')
+            if kind == 'delta':
+                self.read_delta(msg.delta)
+            elif kind == 'script_finished':
+                if msg.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError('app.py has a compile error')
+                if msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    return
+
+    async def rerun(self, trigger=None, fragment_id=''):
+        '''
+        Ask for a rerun with the values of the controls and wait until it finished.
+        @trigger (WidgetState): A button pressed for this run only.
+        @fragment_id (str): Only rerun this fragment (a control inside a section).
+        '''
+        msg = BackMsg()
+        client_state = msg.rerun_script
+        client_state.query_string = ''
+        client_state.widget_states.widgets.extend(list(self.states.values()) + ([trigger] if trigger else []))
+        client_state.cached_message_hashes.extend(self.hashes)
+        client_state.fragment_id = fragment_id
+        await self.websocket.send(msg.SerializeToString())
+        await self.receive_run()
+
+    async def change(self, widget, key, value):
+        '''
+        Change a control like a user and wait for the rerun (see benchmark.SEQUENCES).
+        @widget (str): The kind of the control ('reset' presses the reset button).
+        @key (str): The session state key of the control.
+        @value: The new value.
+        '''
+        if widget == 'reset':
+            kind, widget_id, fragment_id = next(item for name, item in self.widgets.items() if 'Reset' in name)
+            state = WidgetState(id=widget_id, trigger_value=True)
+            # The server sets the controls back, the browser takes these values
+            self.states.clear()
+            await self.rerun(trigger=state, fragment_id=fragment_id)
+            return
+        kind, widget_id, fragment_id = self.widgets[key]
+        state = WidgetState(id=widget_id)
+        if kind == 'slider':
+            state.double_array_value.data[:] = [float(value)]
+        else:
+            state.string_value = str(value)
+        self.states[widget_id] = state
+        await self.rerun(fragment_id=fragment_id)
+
+
+async def play(url, names, repeat, timeout, offset, results):
+    '''
+    One user: play the sequences, every one in a new session.
+    @url (str): The address of the server.
+    @names (list of str): The sequences (see benchmark.SEQUENCES).
+    @repeat (int): How often the sequences are played.
+    @timeout (float): Seconds a rerun may take before it counts as failed.
+    @offset (int): The sequence to begin with, so the users do different things.
+    @results (dict): Collects the latencies ('load', 'change'), 'errors' and 'bytes'.
+    '''
+    import websockets
+
+    stream = url.replace('http', 'ws', 1) + '/_stcore/stream'
+    for index in range(repeat * len(names)):
+        name = names[(index + offset) % len(names)]
+        try:
+            async with websockets.connect(stream, subprotocols=['streamlit'], max_size=None) as websocket:
+                session = Session(websocket)
+                for label, widget, key, value in benchmark.SEQUENCES[name]:
+                    start = time.perf_counter()
+                    if widget is None:
+                        await asyncio.wait_for(session.rerun(), timeout)
+                    else:
+                        await asyncio.wait_for(session.change(widget, key, value), timeout)
+                    results['load' if widget is None else 'change'].append(time.perf_counter() - start)
+                results['errors'] += session.errors
+                results['bytes'] += session.received_bytes
+        except (asyncio.TimeoutError, OSError, KeyError, StopIteration, websockets.WebSocketException):
+            results['errors'] += 1
+
+
+async def sample(pid, samples, stop):
+    '''
+    Read the memory of the server until stop is set.
+    @pid (int): The id of the server process.
+    @samples (list): Collects the resident memory in bytes.
+    @stop (asyncio.Event): Set at the end of the level.
+    '''
+    while not stop.is_set():
+        stats = process_stats(pid)
+        if stats:
+            samples.append(stats[1])
+        try:
+            await asyncio.wait_for(stop.wait(), SAMPLE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_level(url, sessions, names, repeat, timeout, pid):
+    '''
+    Play the sequences with a number of concurrent sessions.
+    @sessions (int): The number of concurrent users.
+    @pid (int): The id of the server process (None: no CPU and memory).
+    @return (dict): The measurements of the level.
+    '''
+    results = {'load': [], 'change': [], 'errors': 0, 'bytes': 0}
+    samples = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample(pid, samples, stop)) if pid else None
+    before = process_stats(pid) if pid else None
+    start = time.perf_counter()
+    await asyncio.gather(*(play(url, names, repeat, timeout, offset, results) for offset in range(sessions)))
+    seconds = time.perf_counter() - start
+    after = process_stats(pid) if pid else None
+    stop.set()
+    if sampler:
+        await sampler
+    reruns = len(results['load']) + len(results['change'])
+    return {
+        'sessions': sessions,
+        'reruns': reruns,
+        'seconds': seconds,
+        'reruns_per_second': reruns / seconds,
+        'load': percentiles(results['load']),
+        'change': percentiles(results['change']),
+        'errors': results['errors'],
+        'received_bytes': results['bytes'],
+        'cpu_percent': 100 * (after[0] - before[0]) / seconds if before and after else None,
+        'rss_peak_bytes': max(samples) if samples else None,
+        'rss_mean_bytes': statistics.mean(samples) if samples else None,
+    }
+
+
+def percentiles(values):
+    '''
+    The median, 90th and 99th percentile of the latencies.
+    @values (list of float): Seconds.
+    @return (dict): 'p50', 'p90', 'p99' (None without values).
+    '''
+    if len(values) < 2:
+        value = values[0] if values else None
+        return {'p50': value, 'p90': value, 'p99': value}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {'p50': statistics.median(values), 'p90': cuts[89], 'p99': cuts[98]}
+
+
+# ---------------------------------
+# Report
+# ---------------------------------
+
+def print_report(levels):
+    def ms(value):
+        return f"{1000 * value:8.0f}" if value is not None else '       -'
+    def mib(value):
+        return f"{value / 2**20:8.0f}" if value is not None else '       -'
+    print(f"{'sessions':>8} {'reruns':>7} {'per s':>6}  {'change p50':>10} {'p90':>8} {'p99':>8}  {'load p50':>8} {'p99':>8}  {'cpu %':>6} {'rss MiB':>8} {'peak':>8} {'errors':>6}")
+    for level in levels:
+        cpu = f"{level['cpu_percent']:6.0f}" if level['cpu_percent'] is not None else '     -'
+        print(f"{level['sessions']:>8} {level['reruns']:>7} {level['reruns_per_second']:>6.1f}  "
+              f"{ms(level['change']['p50'])}   {ms(level['change']['p90'])} {ms(level['change']['p99'])}  "
+              f"{ms(level['load']['p50'])} {ms(level['load']['p99'])}  "
+              f"{cpu} {mib(level['rss_mean_bytes'])} {mib(level['rss_peak_bytes'])} {level['errors']:>6}")
+    print('\nLatencies in ms; change: rerun after a control changed, load: first run of a new session.')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test of the Streamlit server with concurrent sessions.')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8], help='numbers of concurrent sessions to test (default: 1 2 4 8)')
+    parser.add_argument('--sequence', action='append', choices=list(benchmark.SEQUENCES), help='sequence to play (default: all, can be repeated)')
+    parser.add_argument('--repeat', type=int, default=2, help='how often every session plays the sequences (default: 2)')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds a rerun may take before it counts as failed (default: 60)')
+    parser.add_argument('--url', help='use the server running on this address instead of starting one')
+    parser.add_argument('--pid', type=int, help='process id of the server given with --url (for CPU and memory)')
+    parser.add_argument('--port', type=int, default=LOAD_PORT, help=f"port of the started server (default: {LOAD_PORT})")
+    parser.add_argument('--snapshot', default=os.environ.get('CRIME_GER_SNAPSHOT_DIR', 'data/snapshot'), help='snapshot directory of the started server (default: data/snapshot)')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    # Checked before the server is started, play() imports it
+    if importlib.util.find_spec('websockets') is None:
+        sys.exit('The load test needs the websockets package: pip install websockets')
+
+    server = None
+    url, pid = args.url, args.pid
+    if url is None:
+        server = start_server(args.port, args.snapshot)
+        url, pid = f"http://127.0.0.1:{args.port}", server.pid
+    try:
+        wait_ready(url.rstrip('/'))
+        url = url.rstrip('/')
+        levels = []
+        for sessions in args.sessions:
+            levels.append(asyncio.run(run_level(url, sessions, args.sequence or list(benchmark.SEQUENCES), args.repeat, args.timeout, pid)))
+            print(f"{sessions} sessions: {levels[-1]['reruns']} reruns in {levels[-1]['seconds']:.1f} s", file=sys.stderr)
+        print_report(levels)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(levels, f, indent=2)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
@@ -0,0 +1,92 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Indexed lookup of rows in the dashboard tables.
+#
+# Instead of building a boolean mask over a whole table
+# on every rerun, the row positions of every combination
+# of the filter columns are collected once after loading.
+# A chart then only takes the rows it needs.
+# -----------------------------------------------------
+
+
+import itertools
+
+import numpy as np
+
+
+# Columns every table is filtered on by the get_df_* functions in crime_data.py
+INDEX_COLUMNS = {
+    'df_distribution_crime': ['bundesland', 'year', 'age_group', 'sexus', 'schluessel'],
+    'df_laender_abs_rel': ['year', 'age_group', 'sexus', 'schluessel'],
+    'df_bund_laender_abs_rel': ['bundesland', 'age_group', 'sexus', 'schluessel'],
+}
+
+
+class TableIndex:
+    '''
+    The row positions of a dataframe for every combination of
+    values of some of its columns.
+    @df (pandas.Dataframe): The table to index.
+    @columns (list of str): The columns to index.
+    '''
+
+    def __init__(self, df, columns):
+        self.columns = list(columns)
+        self.length = len(df)
+        # One pass over the table: key (tuple of values) -> sorted row positions
+        self.positions = df.groupby(self.columns, sort=False, dropna=False, observed=True).indices
+        if len(self.columns) == 1:
+            self.positions = {(key,): pos for key, pos in self.positions.items()}
+        self._values = {}
+
+    def values(self, column):
+        '''
+        The distinct values of an indexed column (taken from the keys of the index).
+        @column (str): The column, e.g. 'schluessel'.
+        @return (tuple): The values, in the order they first appear in the table.
+        '''
+        found = self._values.get(column)
+        if found is None:
+            position = self.columns.index(column)
+            found = self._values[column] = tuple(dict.fromkeys(key[position] for key in self.positions))
+        return found
+
+    def rows(self, **values):
+        '''
+        Get the positions of the rows matching the given values.
+        @values: One value or a list of values for every indexed column,
+            e.g. rows(year=2022, schluessel=['220000', '210000']). A column
+            that is not given matches all values (the keys of the index are
+            scanned then, which is slower than taking them directly).
+        @return (numpy.ndarray): The row positions in the order of the table.
+        '''
+        choices = []
+        for col in self.columns:
+            if col not in values:
+                choices.append(None)
+                continue
+            value = values[col]
+            choices.append(value if isinstance(value, (list, tuple, set)) else [value])
+        if None in choices:
+            allowed = [None if choice is None else set(choice) for choice in choices]
+            parts = [pos for key, pos in self.positions.items()
+                     if all(accepted is None or part in accepted for part, accepted in zip(key, allowed))]
+        else:
+            parts = [self.positions[key] for key in itertools.product(*choices) if key in self.positions]
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        if len(parts) == 1:
+            return parts[0]
+        # Same order as a boolean mask over the table would give
+        return np.sort(np.concatenate(parts))
+
+    def lookup(self, df, **values):
+        '''
+        Get the rows of the table matching the given values.
+        @df (pandas.Dataframe): The indexed table (or an unchanged copy of it).
+        @values: One value or a list of values for every indexed column.
+        @return (pandas.Dataframe): The matching rows.
+        '''
+        if len(df) != self.length:
+            raise ValueError(f"The index was built for a table with {self.length} rows, not {len(df)}")
+        return df.iloc[self.rows(**values)]
@@ -0,0 +1,97 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# A bounded cache shared by all sessions of the process.
+#
+# Built values are kept until the cache is full, then the
+# least recently used are thrown out first. Used for the
+# figures of the dashboard (see figures.FigureCache) and
+# the responses of the API (see api.py).
+# -----------------------------------------------------
+
+
+import logging
+import threading
+from collections import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedCache:
+    '''
+    A thread safe cache of built values, shared by all sessions.
+    If it is full, the least recently used value is thrown out.
+    @max_entries (int): The maximal number of values in the cache.
+    @report_every (int): Write the hit and miss counts to the log every n lookups.
+    @name (str): The name of the cache in the log.
+    '''
+
+    def __init__(self, max_entries=64, report_every=100, name='Cache'):
+        self.max_entries = max_entries
+        self.report_every = report_every
+        self.name = name
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Counts the calls of clear(), a value built before a clear() is not put into the cache
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, build):
+        '''
+        Get a value from the cache or build it, if it is not in the cache.
+        @key (tuple): The key of the value, e.g. the name of a figure and the
+            values of all controls it depends on.
+        @build (function): Builds the value if it is not in the cache (no arguments).
+        @return: The value.
+        '''
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            lookups = self.hits + self.misses
+            generation = self.generation
+        if lookups % self.report_every == 0:
+            logger.info("%s: %s", self.name, self.stats())
+        if value is not None:
+            return value
+
+        # Build outside of the lock, so other sessions are not blocked
+        value = build()
+        with self.lock:
+            if generation != self.generation:
+                # The data changed while building, the value might be built from the old data
+                return value
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def stats(self):
+        '''
+        Get the counts of the cache.
+        @return (dict): hits, misses, evictions, entries and hit_rate.
+        '''
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def clear(self):
+        '''
+        Throw out all values (e.g. after new data was loaded).
+        '''
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
@@ -0,0 +1,78 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# The map as a component that keeps its geometry.
+#
+# st.plotly_chart sends the whole figure on every change
+# of the map, including the GeoJSON of the federal states.
+# With CRIME_GER_MAP_MODE=component the map is drawn by a
+# small component (frontend/state_map): the geometry and
+# the layout are sent once per session, later changes of
+# the controls only send the 16 values of the states
+# (a few hundred bytes), and the colors are updated in the
+# browser.
+# The browser loads plotly.js from the CDN of Plotly.
+# -----------------------------------------------------
+
+
+import functools
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+
+# 'plotly' (st.plotly_chart) or 'component'
+MAP_MODE = os.environ.get('CRIME_GER_MAP_MODE', 'plotly').lower()
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', 'state_map')
+
+# Session state: the id of the base sent to the browser and the last request for it
+BASE_SENT_KEY = 'state_map_base_sent'
+BASE_REQUEST_KEY = 'state_map_base_request'
+
+_component = components.declare_component('state_map', path=FRONTEND_DIR)
+
+
+def is_component_mode():
+    '''
+    Checks if the map shall be drawn by the component (CRIME_GER_MAP_MODE=component).
+    @return (bool): True in component mode.
+    '''
+    return MAP_MODE == 'component'
+
+
+@functools.lru_cache(maxsize=1)
+def plotly_js():
+    '''
+    The address of plotly.js on the CDN, in the version of the installed plotly package.
+    (Plotly is only imported when the map component is used.)
+    @return (str): The URL.
+    '''
+    from plotly.offline import get_plotlyjs_version
+    return f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+
+
+def state_map(base, values, height=550, key='state_map'):
+    '''
+    Show the map. The base is only sent if the browser does not have it yet
+    (first time in the session or asked for by the component).
+    @base (dict): The base of the map from figures.map_base().
+    @values (dict): The values of the states from figures.map_values().
+    @height (int): The height of the map in pixels.
+    @key (str): The key of the component.
+    '''
+    request = st.session_state.get(key) or {}
+    send_base = st.session_state.get(BASE_SENT_KEY) != base['id']
+    if request.get('missing') == base['id'] and request.get('nonce') != st.session_state.get(BASE_REQUEST_KEY):
+        st.session_state[BASE_REQUEST_KEY] = request.get('nonce')
+        send_base = True
+    _component(
+        base=base if send_base else None,
+        base_id=base['id'],
+        values=values,
+        plotly_js=plotly_js(),
+        height=height,
+        key=key,
+        default=None,
+    )
+    st.session_state[BASE_SENT_KEY] = base['id']
@@ -0,0 +1,195 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Timing of the sections of a rerun of the dashboard.
+#
+# Every section (loading the data, every get_df_* call,
+# every chart, the growth rate cards, ...) is wrapped in
+# a span. The durations are collected per section in
+# histograms, which can be read in the Prometheus text
+# format from a small local HTTP endpoint:
+#
+#   CRIME_GER_METRICS_PORT=9464 streamlit run app.py
+#   curl http://127.0.0.1:9464/metrics
+#
+# In addition every rerun writes one JSON line with the
+# time of all its sections to the log (level DEBUG).
+# -----------------------------------------------------
+
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Upper bounds of the histogram buckets in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIX = 'crime_ger'
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    '''
+    Counts of durations per bucket (like a Prometheus histogram).
+    @buckets (tuple of float): Upper bounds of the buckets in seconds.
+    '''
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+
+
+# Section -> Histogram, shared by all sessions of the process
+_histograms = {}
+_lock = threading.Lock()
+
+# Callbacks returning further values to export, e.g. the counts of the figure cache
+_collectors = {}
+
+# The sections of the rerun running in the current thread (Streamlit runs every session in its own thread)
+_current = threading.local()
+
+
+def observe(section, seconds):
+    '''
+    Record the duration of a section.
+    @section (str): The name of the section, e.g. 'get_df_map'.
+    @seconds (float): The duration.
+    '''
+    with _lock:
+        histogram = _histograms.get(section)
+        if histogram is None:
+            histogram = _histograms[section] = Histogram()
+        histogram.observe(seconds)
+    rerun = getattr(_current, 'sections', None)
+    if rerun is not None:
+        rerun[section] = rerun.get(section, 0.0) + seconds
+
+
+@contextmanager
+def span(section):
+    '''
+    Measure the duration of the code in a with block.
+    @section (str): The name of the section.
+    '''
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(section, time.perf_counter() - start)
+
+
+def begin_rerun():
+    '''
+    Start collecting the sections of a rerun (in the current thread).
+    '''
+    _current.sections = {}
+    _current.start = time.perf_counter()
+
+
+def end_rerun(event='rerun', **fields):
+    '''
+    Finish the rerun started with begin_rerun(): its total time is
+    recorded as section <event> and one JSON line with all its
+    sections is written to the log.
+    @event (str): 'rerun' for a run of the whole page, 'fragment_rerun'
+        for a run of one section only (see sections.py).
+    @fields: Further values of the log line, e.g. the name of the section.
+    @return (dict): Section -> seconds of this rerun.
+    '''
+    sections = getattr(_current, 'sections', None)
+    if sections is None:
+        return {}
+    observe(event, time.perf_counter() - _current.start)
+    _current.sections = None
+    logger.debug(json.dumps({'event': event, **fields, 'sections': {name: round(seconds, 6) for name, seconds in sections.items()}}))
+    return sections
+
+
+def register(name, collector):
+    '''
+    Export further values with the metrics.
+    @name (str): The name of the metric (without prefix), e.g. 'figure_cache'.
+    @collector (function): Returns a dict of label -> number, e.g. figure_cache.stats.
+    '''
+    _collectors[name] = collector
+
+
+def totals():
+    '''
+    The number of calls and the total time of every section so far.
+    @return (dict): Section -> {'count', 'sum'}.
+    '''
+    with _lock:
+        return {section: {'count': histogram.count, 'sum': histogram.sum} for section, histogram in _histograms.items()}
+
+
+def render():
+    '''
+    All metrics in the Prometheus text format.
+    @return (str): The metrics.
+    '''
+    name = f"{PREFIX}_section_seconds"
+    lines = [
+        f"# HELP {name} Time spent in the sections of a rerun of the dashboard.",
+        f"# TYPE {name} histogram",
+    ]
+    with _lock:
+        for section, histogram in sorted(_histograms.items()):
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{section="{section}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{section="{section}"}} {histogram.sum}')
+            lines.append(f'{name}_count{{section="{section}"}} {histogram.count}')
+    for metric, collector in sorted(_collectors.items()):
+        lines.append(f"# TYPE {PREFIX}_{metric} gauge")
+        for label, value in collector().items():
+            lines.append(f'{PREFIX}_{metric}{{value="{label}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # no line on stderr for every scrape
+
+
+def start_server(port, host='127.0.0.1'):
+    '''
+    Serve the metrics on http://host:port/metrics in a background thread.
+    @port (int): The port.
+    @host (str): The address to listen on, only local by default.
+    @return (http.server.ThreadingHTTPServer): The server.
+    '''
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name='metrics_server', daemon=True).start()
+    logger.info("Metrics on http://%s:%d/metrics", host, port)
+    return server
@@ -1,5 +1,4 @@
 import streamlit as st
-from streamlit_extras.switch_page_button import switch_page
 
 
 # ---------------------------------
@@ -147,6 +146,6 @@ with col2:
     st.write('')
 
     if back:
-        switch_page("app")
+        st.switch_page("app.py")
     elif german:
-        switch_page('impressum_de')
+        st.switch_page('pages/impressum_de.py')
@@ -0,0 +1,98 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Patterns of the keys of the PKS (Polizeiliche
+# Kriminalstatistik) for groups of crimes.
+#
+# A key of the PKS has six digits, the first ones are the
+# more general ones (e.g. 435000 and its subkeys 435100,
+# 435200, ...). A pattern can contain:
+#   - '*' for any digit:             '435*00', '*26*00'
+#   - fewer digits for all subkeys:  '43' (= '43****')
+#   - several patterns with commas:  '010000, 020010'
+# The summary keys in the tables ('435*00', '010000, 020010',
+# '------', 'other') are taken as they are, a pattern is only
+# expanded to the keys of the table if it is not such a key.
+# The patterns of a group are compiled to one regular
+# expression, which is matched against the distinct keys of a
+# table at once.
+# -----------------------------------------------------
+
+
+import functools
+import re
+
+import pandas as pd
+
+
+KEY_LENGTH = 6
+
+# A part of a pattern that can be expanded (digits and wildcards)
+_EXPANDABLE = re.compile(r'[0-9*]{1,%d}' % KEY_LENGTH)
+
+
+def split(pattern):
+    '''
+    The single patterns of a pattern with commas.
+    @pattern (str): e.g. '010000, 020010'.
+    @return (list of str): e.g. ['010000', '020010'].
+    '''
+    return [part.strip() for part in pattern.split(',') if part.strip()]
+
+
+def to_regex(part):
+    '''
+    The regular expression of a single pattern.
+    @part (str): e.g. '435*00' or '43'.
+    @return (str): e.g. '435[0-9]00' or '43[0-9]{4}'.
+    '''
+    regex = re.escape(part).replace(r'\*', '[0-9]')
+    missing = KEY_LENGTH - len(part)
+    return regex + (f"[0-9]{{{missing}}}" if missing else '')
+
+
+class KeyMatcher:
+    '''
+    The compiled patterns of one group of crimes.
+    @patterns (list of str): The patterns of the group, e.g. ['435*00', '*26*00'].
+    '''
+
+    def __init__(self, patterns):
+        self.patterns = [patterns] if isinstance(patterns, str) else list(patterns)
+        # Every pattern as a whole and each of its parts can be a key of the table
+        self.candidates = {pattern: [pattern.strip()] + split(pattern) for pattern in self.patterns}
+
+    def match(self, keys):
+        '''
+        The keys of a table that belong to the group.
+        @keys (list of str): The distinct keys of the table.
+        @return (tuple of str): The matching keys, in the order of keys.
+        '''
+        existing = set(keys)
+        literal, expand = set(), []
+        for pattern, (whole, *parts) in self.candidates.items():
+            if whole in existing:
+                literal.add(whole)
+                continue
+            for part in parts:
+                if part in existing:
+                    literal.add(part)
+                elif _EXPANDABLE.fullmatch(part):
+                    expand.append(to_regex(part))
+        if expand:
+            # Only plain keys are expanded, summary keys contain other characters
+            regex = '|'.join(sorted(set(expand)))
+            found = pd.Series(list(keys), dtype='object')
+            mask = found.str.fullmatch(r'[0-9]{%d}' % KEY_LENGTH) & found.str.fullmatch(regex)
+            literal.update(found[mask])
+        return tuple(key for key in keys if key in literal)
+
+
+@functools.lru_cache(maxsize=4096)
+def matching_keys(patterns, keys):
+    '''
+    The keys of a table matching a group of patterns (cached).
+    @patterns (tuple of str): The patterns of the group.
+    @keys (tuple of str): The distinct keys of the table.
+    @return (tuple of str): The matching keys.
+    '''
+    return KeyMatcher(patterns).match(keys)
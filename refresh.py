@@ -0,0 +1,84 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Refresh of the loaded tables while the dashboard runs.
+#
+# Every table has a cheap fingerprint (rows, latest year
+# and a checksum in the database, size and time of the
+# file in the snapshot). A background thread polls the
+# fingerprints and loads only the tables whose fingerprint
+# changed. They are swapped into crime_data.py at once,
+# running sessions go on with the tables they already got.
+#
+# The interval is set with CRIME_GER_REFRESH_INTERVAL in
+# seconds (default 300, 0 switches the refresh off).
+# -----------------------------------------------------
+
+
+import logging
+import os
+import threading
+import time
+
+import crime_data
+import source
+
+
+REFRESH_INTERVAL = float(os.environ.get('CRIME_GER_REFRESH_INTERVAL', 300))
+
+logger = logging.getLogger(__name__)
+
+
+class Refresher:
+    '''
+    Polls the fingerprints of the tables in a background thread and
+    reloads the tables that changed.
+    @interval (float): Seconds between two polls.
+    @on_change (list of functions): Called with the names of the changed
+        tables after they were swapped in, e.g. to clear caches.
+    '''
+
+    def __init__(self, interval=REFRESH_INTERVAL, on_change=()):
+        self.interval = interval
+        self.on_change = list(on_change)
+        self.known = {}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self, known=None):
+        '''
+        Start polling in a daemon thread.
+        @known (dict): The fingerprints of the loaded tables, by default
+            the current ones are taken.
+        '''
+        self.known = dict(known) if known is not None else source.fingerprints()
+        self.thread = threading.Thread(target=self.run, name='refresh_tables', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                # Keep the loaded tables and try again at the next poll
+                logger.exception("Refresh: checking the tables failed")
+
+    def check(self):
+        '''
+        Compare the fingerprints once and reload the changed tables.
+        @return (list of str): The names of the reloaded tables.
+        '''
+        current = source.fingerprints()
+        changed = sorted(name for name, fingerprint in current.items()
+                         if name in crime_data.table_names() and self.known.get(name) != fingerprint)
+        if not changed:
+            return []
+        start = time.perf_counter()
+        crime_data.update_tables(source.load(changed))
+        self.known.update({name: current[name] for name in changed})
+        logger.info("Refresh: reloaded %s in %.1f s", ', '.join(changed), time.perf_counter() - start)
+        for callback in self.on_change:
+            callback(changed)
+        return changed
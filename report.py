@@ -0,0 +1,303 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Static reports of the dashboard for all selections.
+#
+# Renders the charts and growth rate cards of the dashboard
+# for every combination of federal state, year, age group
+# and gender, with the get_df_* functions of crime_data.py
+# and the figures of figures.py, in a pool of processes:
+#
+#   python report.py                     # HTML to reports/
+#   python report.py --format png        # PNG (needs kaleido)
+#   python report.py --state Bayern --year 2022
+#
+# Every finished report is written to progress.jsonl in
+# the output directory. A run that was stopped goes on
+# with the missing reports when it is started again.
+# At the end the time per report is summarized.
+# -----------------------------------------------------
+
+
+import argparse
+import itertools
+import json
+import os
+import re
+import shutil
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cards
+import crime_data
+import figures
+import geodata
+
+
+REPORT_DIR = 'reports'
+PROGRESS_FILE = 'progress.jsonl'
+
+# Same zoom as the map of the dashboard
+MAP_ZOOM = 4.8
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Juvenile Crime in Germany - {title}</title></head>
+<body style='font-family: sans-serif; margin: 2rem;'>
+<h3>Juvenile Crime in Germany</h3>
+<div><b>State:</b> {state}, <b>Year:</b> {year}, <b>Crime:</b> {crime}, <b>Age:</b> {age}, <b>Gender:</b> {sex}</div>
+{charts}
+{style}
+<h4>Overview of Years</h4>
+<div style='display: flex; gap: 1rem;'><div style='flex: 1;'>{card_abs}</div><div style='flex: 1;'>{card_rel}</div></div>
+{years}
+</body>
+</html>
+"""
+
+# Set in every process of the pool by init_worker()
+_geo_data = None
+
+
+# ---------------------------------
+# Items
+# ---------------------------------
+
+def items(states=None, years=None, ages=None, genders=None):
+    '''
+    All selections to render.
+    @states, years, ages, genders (list): Only these values (default: all of the controls).
+    @return (list of tuple): (federal_state, year, age_group, gender) with the names of the controls.
+    '''
+    return list(itertools.product(
+        states or crime_data.federal_states,
+        years or crime_data.years,
+        ages or list(crime_data.age_groups),
+        genders or list(crime_data.genders),
+    ))
+
+
+def item_name(item):
+    '''
+    The name of the file of a report.
+    @item (tuple): (federal_state, year, age_group, gender).
+    @return (str): e.g. '2022_Baden-Wuerttemberg_14_to_16_Female'.
+    '''
+    name = '_'.join(str(value) for value in (item[1], item[0], item[2], item[3]))
+    name = name.replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue').replace('ß', 'ss')
+    return re.sub(r'[^A-Za-z0-9-]+', '_', name).strip('_')
+
+
+def read_progress(directory):
+    '''
+    The reports finished in earlier runs (and whose files still exist).
+    @directory (str): The output directory.
+    @return (dict): Name of the report -> its entry in progress.jsonl.
+    '''
+    path = os.path.join(directory, PROGRESS_FILE)
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue # the last line of a run that was killed while writing
+            if os.path.exists(os.path.join(directory, entry['file'])):
+                done[entry['item']] = entry
+    return done
+
+
+# ---------------------------------
+# Worker
+# ---------------------------------
+
+def init_worker():
+    '''
+    Load the data once in every process of the pool, like the dashboard
+    at start (source.py, with the cube if it matches the tables).
+    '''
+    global _geo_data
+    import cube
+    import snapshot
+    import source
+    if source.is_query_mode():
+        crime_data.set_slice_reader(source.read_slice, source.available_years())
+    else:
+        crime_data.set_tables(source.load(), load_partition=source.load_partition)
+        dataframes = {name: crime_data.get_table(name) for name in crime_data.table_names()}
+        crime_data.cube = cube.read(cube.CUBE_DIR, cube.fingerprint(dataframes))
+    file_name = geodata.level_file(geodata.level_for_zoom(MAP_ZOOM))
+    if snapshot.is_offline():
+        _geo_data = snapshot.read_geodata(file_name=os.path.basename(file_name))
+    else:
+        with open(file_name) as f:
+            _geo_data = json.load(f)
+
+
+def build_figures(item, crime_type, abs_rel):
+    '''
+    The figures of the dashboard for one selection.
+    @item (tuple): (federal_state, year, age_group, gender).
+    @crime_type (str): The type of crime of the map and the growth rates.
+    @abs_rel (str): 'Relative' or 'Absolute' values in the map.
+    @return (dict, pandas.Dataframe): Name -> figure, and the growth rates.
+    '''
+    state, year, age_group, gender = item
+    crime, age, sex = crime_data.crime_types[crime_type], crime_data.age_groups[age_group], crime_data.genders[gender]
+    color_column = 'offenders_rel' if abs_rel == 'Relative' else 'offenders'
+    if state == 'Germany':
+        top_crimes = crime_data.get_top_crimes_germany(year, age, sex)
+    else:
+        top_crimes = crime_data.get_top_crimes_federal_states(state, year, age, sex)
+    linechart = crime_data.get_df_overview_linechart(state, crime, age, sex)
+    figs = {
+        'fig1_map': figures.map_figure(crime_data.get_df_map(crime, year, age, sex), color_column, _geo_data, MAP_ZOOM),
+        'fig2_top_crimes': figures.top_crimes_figure(top_crimes),
+        'fig3_crime_types': figures.crime_types_figure(crime_data.get_df_overview_pie(state, year, age, sex)),
+        'fig4_years_absolute': figures.years_figure(linechart, 'offenders', 'No. Offenders'),
+        'fig5_years_relative': figures.years_figure(linechart, 'offenders_rel', 'No. Offenders / 100.000'),
+    }
+    return figs, crime_data.get_df_growth_rate(state, crime, year, age, sex)
+
+
+def render(item, directory, fmt='html', crime_type='All', abs_rel='Relative', plotlyjs='cdn'):
+    '''
+    Render the report of one selection. The file is written under a
+    temporary name and renamed when it is complete.
+    @item (tuple): (federal_state, year, age_group, gender).
+    @directory (str): The output directory.
+    @fmt (str): 'html' (one page with all charts and cards) or 'png'
+        (a directory with one image per chart, needs kaleido).
+    @crime_type (str): The type of crime of the map and the growth rates.
+    @abs_rel (str): 'Relative' or 'Absolute' values in the map.
+    @plotlyjs (str): 'cdn' or 'inline' (plotly.js in every HTML file).
+    @return (dict): 'item', 'file', 'seconds' and 'bytes' of the report.
+    '''
+    start = time.perf_counter()
+    state, year, age_group, gender = item
+    name = item_name(item)
+    figs, df_growth = build_figures(item, crime_type, abs_rel)
+    if fmt == 'png':
+        path = os.path.join(directory, name)
+        tmp = path + '.tmp'
+        os.makedirs(tmp, exist_ok=True)
+        for fig_name, fig in figs.items():
+            fig.write_image(os.path.join(tmp, f"{fig_name}.png"))
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+        size = sum(os.path.getsize(os.path.join(path, file)) for file in os.listdir(path))
+    else:
+        path = os.path.join(directory, name + '.html')
+        age, sex = cards.display_age(age_group), cards.display_sex(gender)
+        html = [fig.to_html(full_html=False, include_plotlyjs=(plotlyjs if i == 0 else False))
+                for i, fig in enumerate(figs.values())]
+        page = PAGE.format(
+            title=name, state=state, year=year, crime=crime_type, age=age, sex=sex,
+            charts='\n'.join(html[:3]),
+            style=cards.BOX_STYLE,
+            card_abs=cards.growth_card(df_growth, 'growth_abs', 'Absolute', state, year, crime_type, age, sex),
+            card_rel=cards.growth_card(df_growth, 'growth_rel', 'Relative', state, year, crime_type, age, sex),
+            years='\n'.join(html[3:]),
+        )
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(page)
+        os.replace(path + '.tmp', path)
+        size = os.path.getsize(path)
+    return {'item': name, 'file': os.path.basename(path), 'seconds': round(time.perf_counter() - start, 4), 'bytes': size}
+
+
+# ---------------------------------
+# Run
+# ---------------------------------
+
+def run(selection, directory=REPORT_DIR, workers=None, restart=False, **options):
+    '''
+    Render all reports of the selection that are not done yet in a pool of processes.
+    @selection (list of tuple): The items from items().
+    @directory (str): The output directory.
+    @workers (int): Number of processes (default: number of CPUs).
+    @restart (bool): Render all reports again, ignoring progress.jsonl.
+    @options: fmt, crime_type, abs_rel and plotlyjs of render().
+    @return (dict): 'rendered', 'skipped', 'failed' (list of (item, error)), 'seconds' (per report) and 'total' (wall time).
+    '''
+    os.makedirs(directory, exist_ok=True)
+    progress_path = os.path.join(directory, PROGRESS_FILE)
+    if restart and os.path.exists(progress_path):
+        os.remove(progress_path)
+    done = read_progress(directory)
+    todo = [item for item in selection if item_name(item) not in done]
+    result = {'rendered': 0, 'skipped': len(selection) - len(todo), 'failed': [], 'seconds': {}, 'total': 0.0}
+    if not todo:
+        return result
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor, open(progress_path, 'a') as progress:
+        futures = {executor.submit(render, item, directory, **options): item for item in todo}
+        for number, future in enumerate(as_completed(futures), start=1):
+            item = futures[future]
+            try:
+                entry = future.result()
+            except Exception as err:
+                result['failed'].append((item_name(item), err))
+                print(f"[{number}/{len(todo)}] {item_name(item)} failed: {err}")
+                continue
+            progress.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            progress.flush()
+            result['rendered'] += 1
+            result['seconds'][entry['item']] = entry['seconds']
+            print(f"[{number}/{len(todo)}] {entry['item']} {entry['seconds']:.2f} s")
+    result['total'] = time.perf_counter() - start
+    return result
+
+
+def summary(result):
+    '''
+    Print the time per report of a run.
+    @result (dict): The result of run().
+    '''
+    seconds = sorted(result['seconds'].values())
+    print(f"Rendered {result['rendered']}, skipped {result['skipped']} (done before), failed {len(result['failed'])}")
+    if seconds:
+        p95 = seconds[min(len(seconds) - 1, int(0.95 * len(seconds)))]
+        print(f"Time per report: mean {statistics.mean(seconds):.2f} s, median {statistics.median(seconds):.2f} s, "
+              f"p95 {p95:.2f} s, max {seconds[-1]:.2f} s")
+        print(f"Total {result['total']:.1f} s, {result['rendered'] / result['total']:.1f} reports/s")
+        for name, value in sorted(result['seconds'].items(), key=lambda entry: -entry[1])[:3]:
+            print(f"  slowest: {name} {value:.2f} s")
+    for name, err in result['failed']:
+        print(f"  failed: {name}: {err}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render static reports of the dashboard for all selections.')
+    parser.add_argument('--dir', default=REPORT_DIR, help=f"output directory (default: {REPORT_DIR})")
+    parser.add_argument('--format', default='html', choices=['html', 'png'], help="one HTML page or PNG images (needs kaleido) per report (default: html)")
+    parser.add_argument('--state', action='append', choices=crime_data.federal_states, help='federal state (default: all, can be repeated)')
+    parser.add_argument('--year', action='append', type=int, help='year (default: all, can be repeated)')
+    parser.add_argument('--age-group', action='append', choices=list(crime_data.age_groups), help='age group (default: all, can be repeated)')
+    parser.add_argument('--gender', action='append', choices=list(crime_data.genders), help='gender (default: all, can be repeated)')
+    parser.add_argument('--crime-type', default='All', choices=list(crime_data.crime_types), help='type of crime of the map and growth rates (default: All)')
+    parser.add_argument('--values', default='Relative', choices=['Relative', 'Absolute'], help='values of the map (default: Relative)')
+    parser.add_argument('--plotlyjs', default='cdn', choices=['cdn', 'inline'], help='plotly.js from the CDN or in every HTML file (default: cdn)')
+    parser.add_argument('--workers', type=int, help='number of processes (default: number of CPUs)')
+    parser.add_argument('--restart', action='store_true', help='render all reports again')
+    args = parser.parse_args()
+
+    if args.year is None:
+        # The years of the data (the defaults of crime_data.py might be outdated)
+        import source
+        if source.is_query_mode():
+            years = source.available_years()
+        else:
+            years = sorted({int(year) for year in source.load(['df_bund_laender_abs_rel'])['df_bund_laender_abs_rel']['year']})
+    else:
+        years = args.year
+    result = run(
+        items(args.state, years, args.age_group, args.gender),
+        directory=args.dir, workers=args.workers, restart=args.restart,
+        fmt=args.format, crime_type=args.crime_type, abs_rel=args.values, plotlyjs=args.plotlyjs,
+    )
+    summary(result)
@@ -0,0 +1,164 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# The sections of the dashboard and the controls they read.
+#
+# Every section (the map, the top crimes, the types of
+# crime, the growth rate cards and the charts of the years)
+# is a Streamlit fragment and declares the session state
+# keys it reads. It gets exactly these values as arguments,
+# so it can not depend on a control without declaring it.
+#
+# A widget inside a section (like the absolute/relative
+# radio of the map) only reruns its own section. The
+# controls in the sidebar rerun only the sections reading
+# their key (rerun_dependents() as on_change callback),
+# the other sections are neither run nor sent again.
+#
+# If a control changes while a run is still computing,
+# the run is cancelled at the next section (checkpoint())
+# and only the new state is computed. With
+# CRIME_GER_DEBOUNCE (seconds, default 0 = off) the
+# sections wait that long after a control changed, so
+# a quick series of changes (e.g. clicking through the
+# federal states) only computes the last one.
+# -----------------------------------------------------
+
+
+import functools
+import os
+import threading
+import time
+
+import streamlit as st
+from streamlit.runtime.scriptrunner_utils.exceptions import RerunException
+from streamlit.runtime.scriptrunner_utils.script_run_context import get_script_run_ctx
+
+import metrics
+
+
+# Seconds to wait after a control changed before computing (0: do not wait)
+DEBOUNCE = float(os.environ.get('CRIME_GER_DEBOUNCE', 0))
+
+# Session state: a control changed and the next section has to wait (see rerun_dependents())
+DEBOUNCE_KEY = 'sections_debounce'
+
+# Name of the section -> the session state keys it reads
+SECTIONS = {}
+
+# Counts of the runs cancelled at a checkpoint and of the waits of the debouncing
+_counts = {'cancelled': 0, 'debounced': 0}
+_lock = threading.Lock()
+
+
+def _count(name):
+    with _lock:
+        _counts[name] += 1
+
+
+def checkpoint(placeholder=None):
+    '''
+    Cooperative cancellation: if a control changed since this run started,
+    the run stops here and Streamlit starts the new one. Sending an element
+    is the point where Streamlit checks for a new run, an empty placeholder
+    is used (it is not shown).
+    @placeholder (streamlit.delta_generator.DeltaGenerator): A placeholder from
+        st.empty() to use, otherwise a new one is added.
+    '''
+    try:
+        if placeholder is None:
+            st.empty()
+        else:
+            placeholder.empty()
+    except RerunException:
+        _count('cancelled')
+        raise
+
+
+def debounce():
+    '''
+    Wait DEBOUNCE seconds if a control changed, a further change in this
+    time cancels the run before anything was computed.
+    '''
+    if not DEBOUNCE or not st.session_state.get(DEBOUNCE_KEY):
+        return
+    placeholder = st.empty()
+    deadline = time.monotonic() + DEBOUNCE
+    while time.monotonic() < deadline:
+        time.sleep(min(0.02, DEBOUNCE))
+        checkpoint(placeholder)
+    st.session_state[DEBOUNCE_KEY] = False
+    _count('debounced')
+
+
+def stats():
+    '''
+    Get the counts of cancelled runs and waits (e.g. for metrics.register()).
+    @return (dict): 'cancelled' and 'debounced'.
+    '''
+    with _lock:
+        return dict(_counts)
+
+
+def is_fragment_run():
+    '''
+    Checks if only sections run (a control in a section or in the sidebar
+    changed), not the whole page. The top of app.py with
+    metrics.begin_rerun() and metrics.end_rerun() is not run then.
+    @return (bool): True if only sections run.
+    '''
+    ctx = get_script_run_ctx()
+    return bool(ctx is not None and ctx.fragment_ids_this_run)
+
+
+def section(*reads):
+    '''
+    Decorator turning a function into a section of the dashboard
+    (a fragment with the name of the function as key).
+    The function is called with the current values of the keys as
+    keyword arguments and is timed as 'section_<name>' (see metrics.py).
+    If only the section runs, the run is recorded as 'fragment_rerun'.
+    Before, the run can be cancelled (see debounce() and checkpoint()).
+    @reads (str): The session state keys the section reads, e.g. 'year'.
+    @return (function): The decorator.
+    '''
+    def decorator(function):
+        SECTIONS[function.__name__] = reads
+
+        @st.fragment(key=function.__name__)
+        @functools.wraps(function)
+        def fragment():
+            fragment_run = is_fragment_run()
+            if fragment_run:
+                metrics.begin_rerun()
+            try:
+                # Stop here if the run is already superseded by a newer one
+                debounce()
+                checkpoint()
+                with metrics.span('section_' + function.__name__):
+                    function(**{key: st.session_state[key] for key in reads})
+            finally:
+                if fragment_run:
+                    metrics.end_rerun('fragment_rerun', section=function.__name__)
+        return fragment
+    return decorator
+
+
+def dependents(key):
+    '''
+    The sections that have to be shown again when a control changes.
+    @key (str): The session state key of the control, e.g. 'abs_rel'.
+    @return (list of str): The names of the sections reading the key.
+    '''
+    return [name for name, reads in SECTIONS.items() if key in reads]
+
+
+def rerun_dependents(key):
+    '''
+    Callback (on_change) of a control outside of the sections:
+    instead of the whole page only the sections reading its key are run.
+    @key (str): The session state key of the control.
+    '''
+    st.session_state[DEBOUNCE_KEY] = True
+    names = dependents(key)
+    if names:
+        st.rerun(scope=names)
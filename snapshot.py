@@ -0,0 +1,240 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Local snapshot of the dashboard data.
+#
+# The tables from the database are written to Arrow IPC
+# files (uncompressed), which are read back with memory
+# mapping. The tables the charts filter on one year are
+# written with one file per year, so the dashboard can
+# load only the years it needs. With the snapshot the
+# dashboard starts without a database connection (offline
+# mode). pyarrow is only imported when a snapshot is read
+# or written:
+#
+#   python snapshot.py export            # write the snapshot
+#   CRIME_GER_DATA_SOURCE=snapshot streamlit run app.py
+# -----------------------------------------------------
+
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import crime_data
+import geodata
+
+
+# Where the snapshot is written to and read from
+SNAPSHOT_DIR = os.environ.get('CRIME_GER_SNAPSHOT_DIR', 'data/snapshot')
+GEODATA_FILE = 'data/bundeslaender_polygons.json'
+# The full resolution geodata and its simplified levels of detail (see geodata.py)
+GEODATA_FILES = [GEODATA_FILE] + [geodata.level_file(level) for level in geodata.LEVELS]
+MANIFEST = 'manifest.json'
+
+
+def is_offline():
+    '''
+    Checks if the dashboard shall read its data from the snapshot
+    instead of the database. This is switched on with the environment
+    variable CRIME_GER_DATA_SOURCE=snapshot.
+    @return (bool): True if the snapshot shall be used.
+    '''
+    return os.environ.get('CRIME_GER_DATA_SOURCE', 'database').lower() == 'snapshot'
+
+
+def _write_arrow(df, path):
+    import pyarrow.feather as feather
+    feather.write_feather(df.reset_index(drop=True), path + '.tmp', compression='uncompressed')
+    os.replace(path + '.tmp', path)
+
+
+def write_snapshot(dataframes, directory=SNAPSHOT_DIR, geodata_files=GEODATA_FILES, source_tables=None, partitioned=crime_data.YEAR_PARTITIONED):
+    '''
+    Write dataframes and the geodata to a snapshot directory.
+    Every dataframe is written to its own uncompressed Arrow IPC file
+    (the partitioned ones to one file per year, e.g. df_laender_abs_rel.2022.arrow),
+    so that it can be memory-mapped when reading it. The files are
+    written under a temporary name first and the manifest is written
+    last, so a running dashboard never sees a half written snapshot.
+    @dataframes (dict): Name of the dataframe -> pandas.Dataframe.
+    @directory (str): The snapshot directory.
+    @geodata_files (list of str): The GeoJSON files to copy into the snapshot.
+    @source_tables (dict): Optional name of the dataframe -> table in the database.
+    @partitioned (list of str): The dataframes written with one file per year.
+    @return (dict): The manifest of the snapshot.
+    '''
+    os.makedirs(directory, exist_ok=True)
+    manifest = {'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'tables': {}, 'geodata': []}
+    for name, df in dataframes.items():
+        entry = {
+            'rows': len(df),
+            'columns': [str(col) for col in df.columns],
+            'source': (source_tables or {}).get(name),
+        }
+        if name in partitioned:
+            entry['partitions'] = {}
+            for year, part in df.groupby('year', sort=True):
+                file_name = f"{name}.{int(year)}.arrow"
+                _write_arrow(part, os.path.join(directory, file_name))
+                entry['partitions'][str(int(year))] = {'file': file_name, 'rows': len(part)}
+        else:
+            entry['file'] = f"{name}.arrow"
+            _write_arrow(df, os.path.join(directory, entry['file']))
+        manifest['tables'][name] = entry
+    for geodata_file in geodata_files:
+        if not os.path.exists(geodata_file):
+            continue
+        file_name = os.path.basename(geodata_file)
+        shutil.copyfile(geodata_file, os.path.join(directory, file_name + '.tmp'))
+        os.replace(os.path.join(directory, file_name + '.tmp'), os.path.join(directory, file_name))
+        manifest['geodata'].append(file_name)
+    with open(os.path.join(directory, MANIFEST + '.tmp'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(os.path.join(directory, MANIFEST + '.tmp'), os.path.join(directory, MANIFEST))
+    return manifest
+
+
+def read_manifest(directory=SNAPSHOT_DIR):
+    '''
+    Read the manifest of a snapshot.
+    @directory (str): The snapshot directory.
+    @return (dict): The manifest.
+    '''
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No snapshot found in '{directory}'. Create one with: python snapshot.py export")
+    with open(path) as f:
+        return json.load(f)
+
+
+def _table_files(entry, years=None):
+    '''
+    The files of a table in the manifest, of a partitioned table only the ones of the given years.
+    '''
+    if 'partitions' not in entry:
+        return [entry['file']]
+    return [part['file'] for year, part in sorted(entry['partitions'].items()) if years is None or int(year) in years]
+
+
+def read_table(name, directory=SNAPSHOT_DIR, years=None):
+    '''
+    Read one table of the snapshot as pandas dataframe.
+    The file is memory-mapped, so the numeric columns are not copied
+    and several processes share the same pages of the file.
+    @name (str): The name of the dataframe, e.g. 'df_laender_abs_rel'.
+    @directory (str): The snapshot directory.
+    @years (list of int): Of a partitioned table only read these years (default: all).
+    @return (pandas.Dataframe): The table (without rows if none of the years is there).
+    '''
+    import pyarrow as pa
+    entry = read_manifest(directory)['tables'][name]
+    parts = []
+    for file_name in _table_files(entry, years):
+        source = pa.memory_map(os.path.join(directory, file_name), 'r')
+        parts.append(pa.ipc.open_file(source).read_all())
+    if not parts:
+        # The schema is taken from one of the other years
+        source = pa.memory_map(os.path.join(directory, _table_files(entry)[0]), 'r')
+        return pa.ipc.open_file(source).schema.empty_table().to_pandas()
+    if len(parts) == 1:
+        return parts[0].to_pandas()
+    # The dictionaries of the categorical columns are unified when converting
+    return pa.concat_tables(parts).to_pandas()
+
+
+def read_partition(name, year, directory=SNAPSHOT_DIR):
+    '''
+    Read the rows of one year of a table.
+    @name (str): The name of the dataframe, e.g. 'df_laender_abs_rel'.
+    @year (int): The year.
+    @directory (str): The snapshot directory.
+    @return (pandas.Dataframe): The rows of the year.
+    '''
+    entry = read_manifest(directory)['tables'][name]
+    if 'partitions' not in entry:
+        df = read_table(name, directory)
+        return df[df['year'] == year].reset_index(drop=True)
+    if str(year) not in entry['partitions']:
+        raise KeyError(f"No data for {year} in {name}")
+    return read_table(name, directory, years=[year])
+
+
+def read_snapshot(directory=SNAPSHOT_DIR, recent_years=None, names=None):
+    '''
+    Read all tables of the snapshot.
+    @directory (str): The snapshot directory.
+    @recent_years (int): Of the partitioned tables only read the latest
+        years (default: all), the others can be read with read_partition().
+    @names (list of str): Only read these tables (default: all).
+    @return (dict): Name of the dataframe -> pandas.Dataframe.
+    '''
+    dataframes = {}
+    for name, entry in read_manifest(directory)['tables'].items():
+        if names is not None and name not in names:
+            continue
+        years = None
+        if recent_years and 'partitions' in entry:
+            years = sorted(int(year) for year in entry['partitions'])[-recent_years:]
+        dataframes[name] = read_table(name, directory, years)
+    return dataframes
+
+
+def table_fingerprints(directory=SNAPSHOT_DIR):
+    '''
+    Get a cheap fingerprint of every table of the snapshot (rows, size
+    and modification time of its files). A new export changes them.
+    @directory (str): The snapshot directory.
+    @return (dict): Name of the dataframe -> fingerprint (str).
+    '''
+    fingerprints = {}
+    for name, table in read_manifest(directory)['tables'].items():
+        stats = [os.stat(os.path.join(directory, file_name)) for file_name in _table_files(table)]
+        fingerprints[name] = f"{table['rows']}:{sum(stat.st_size for stat in stats)}:{max(stat.st_mtime_ns for stat in stats)}"
+    return fingerprints
+
+
+def read_geodata(directory=SNAPSHOT_DIR, file_name=os.path.basename(GEODATA_FILE)):
+    '''
+    Read the geodata (GeoJSON of the federal states) of the snapshot.
+    @directory (str): The snapshot directory.
+    @file_name (str): The GeoJSON file, by default the full resolution one.
+    @return (dict): The GeoJSON.
+    '''
+    if file_name not in read_manifest(directory)['geodata']:
+        raise FileNotFoundError(f"'{file_name}' is not part of the snapshot in '{directory}'")
+    with open(os.path.join(directory, file_name)) as f:
+        return json.load(f)
+
+
+def export_snapshot(directory=SNAPSHOT_DIR):
+    '''
+    Load all tables of the dashboard from the database, make them
+    memory-compact and write them together with the geodata to a snapshot.
+    The database credentials are read from .streamlit/secrets.toml.
+    @directory (str): The snapshot directory.
+    @return (dict): The manifest of the snapshot.
+    '''
+    import compact
+    import database
+    dataframes, report = database.load_tables()
+    # Categoricals are stored as Arrow dictionaries and are read back as categoricals
+    dataframes, report = compact.compact_tables(dataframes)
+    return write_snapshot(dataframes, directory, source_tables=database.TABLES)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local snapshot of the dashboard data.')
+    parser.add_argument('command', choices=['export', 'info'], help="'export' loads the tables from the database and writes the snapshot, 'info' shows the manifest")
+    parser.add_argument('--dir', default=SNAPSHOT_DIR, help=f"snapshot directory (default: {SNAPSHOT_DIR})")
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        manifest = export_snapshot(args.dir)
+    else:
+        manifest = read_manifest(args.dir)
+    for name, table in manifest['tables'].items():
+        files = table['file'] if 'partitions' not in table else f"{len(table['partitions'])} partitions ({', '.join(table['partitions'])})"
+        print(f"{name:<25} {table['rows']:>8} rows  {files}")
+    print(f"geodata: {', '.join(manifest['geodata'])}, created: {manifest['created']}")
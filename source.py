@@ -0,0 +1,115 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# The source of the dashboard data.
+#
+# The tables are loaded from the database or, in offline
+# mode, from the snapshot (see snapshot.py). Of the tables
+# partitioned by year only the latest years are loaded at
+# start (CRIME_GER_RECENT_YEARS, default 3), older years
+# are loaded when a session selects them, so the start
+# does not get slower as more years are added.
+#
+# In query mode (CRIME_GER_DATA_SOURCE=query) no table is
+# loaded at all: every chart reads only its rows with a
+# parameterized query (see database.read_slice()), so the
+# data does not have to fit into the memory of the app.
+# -----------------------------------------------------
+
+
+import os
+
+import crime_data
+import pks
+import snapshot
+
+
+RECENT_YEARS = int(os.environ.get('CRIME_GER_RECENT_YEARS', 3))
+
+
+def is_query_mode():
+    '''
+    Checks if the charts shall query their rows from the database instead
+    of loading the tables (CRIME_GER_DATA_SOURCE=query).
+    @return (bool): True in query mode.
+    '''
+    return os.environ.get('CRIME_GER_DATA_SOURCE', 'database').lower() == 'query'
+
+
+def load(names=None, recent_years=RECENT_YEARS):
+    '''
+    Load tables from the current data source.
+    @names (list of str): The names of the dataframes (default: all).
+    @recent_years (int): Of the tables partitioned by year only load the latest years (0: all).
+    @return (dict): Name of the dataframe -> pandas.Dataframe.
+    @raise database.TableLoadError: If a table could not be loaded from the database.
+    '''
+    if snapshot.is_offline():
+        return snapshot.read_snapshot(recent_years=recent_years, names=names or crime_data.TABLE_NAMES)
+    import database
+    tables = database.TABLES if names is None else {name: database.TABLES[name] for name in names}
+    dataframes, report = database.load_tables(tables, recent_years=recent_years, partitioned=crime_data.YEAR_PARTITIONED)
+    return dataframes
+
+
+def load_partition(name, year):
+    '''
+    Load the rows of one year of a table partitioned by year.
+    @name (str): The name of the dataframe, e.g. 'df_laender_abs_rel'.
+    @year (int): The year.
+    @return (pandas.Dataframe): The rows of the year.
+    '''
+    if snapshot.is_offline():
+        return snapshot.read_partition(name, year)
+    import database
+    return database.load_partition(name, year)
+
+
+def fingerprints():
+    '''
+    Get the fingerprints of all tables of the current data source
+    (see database.table_fingerprints() and snapshot.table_fingerprints()).
+    @return (dict): Name of the dataframe -> fingerprint (str).
+    '''
+    if snapshot.is_offline():
+        return snapshot.table_fingerprints()
+    import database
+    return database.table_fingerprints()
+
+
+def read_slice(name, columns, values, sums=()):
+    '''
+    Query mode: read the rows of a table matching the given values
+    (see crime_data.set_slice_reader()).
+    @name (str): The name of the dataframe, e.g. 'df_laender_abs_rel'.
+    @columns (list of str): Only these columns, None for all.
+    @values (dict): Column -> one value or a list of values. The values of
+        'schluessel' are patterns of PKS keys (see pks.py), they are matched
+        against the distinct keys of the table like in the other modes.
+    @sums (tuple of str): If several keys match, these columns are added up
+        over the keys by the database (see crime_data.combine_crimes()).
+    @return (pandas.Dataframe): The matching rows. Added up rows have
+        no 'schluessel' and 'straftat' (they belong to all the keys).
+    '''
+    import database
+    if 'schluessel' in values:
+        crime = values['schluessel']
+        patterns = tuple(crime) if isinstance(crime, (list, tuple, set)) else (crime,)
+        keys = database.distinct_values(database.TABLES[name], 'schluessel')
+        values = dict(values, schluessel=pks.matching_keys(patterns, keys))
+    filters = tuple(
+        (col, tuple(value) if isinstance(value, (list, tuple, set)) else (value,))
+        for col, value in sorted(values.items())
+    )
+    if sums and len(values.get('schluessel', ())) > 1:
+        columns = [col for col in columns if col not in ('schluessel', 'straftat')]
+        return database.read_slice(database.TABLES[name], tuple(columns), filters, tuple(sums))
+    return database.read_slice(database.TABLES[name], tuple(columns) if columns else None, filters)
+
+
+def available_years():
+    '''
+    Query mode: the years in the data.
+    @return (list of int): The years.
+    '''
+    import database
+    return database.available_years()
@@ -0,0 +1,356 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Synthetic data in the shape of the PKS tables.
+#
+# Generates the tables of the dashboard (database.TABLES,
+# same names and columns as the *_2022_until_2018 tables
+# in the database) and matching GeoJSON at any scale:
+# more years, more regions (e.g. all ~400 Kreise), more
+# crime keys and more age bands. The numbers are random
+# but consistent: the sexes add up to 'X', the age bands
+# to the group of 14 to <21, the regions to Germany and
+# the crimes to the total ('------'). The data is written
+# to a snapshot directory (offline mode, see snapshot.py)
+# and/or loaded into a local PostgreSQL database:
+#
+#   python synthetic.py --snapshot data/synthetic --years 20 --regions 400 --crimes 200 --age-bands 8
+#   CRIME_GER_DATA_SOURCE=snapshot CRIME_GER_SNAPSHOT_DIR=data/synthetic streamlit run app.py
+#   python synthetic.py --postgres "host=localhost dbname=crime user=postgres"
+#
+# Only the federal states, crimes and age groups of the
+# controls can be selected in the dashboard, the added
+# ones make the tables (and the map) larger.
+# -----------------------------------------------------
+
+
+import argparse
+import io
+import json
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import compact
+import crime_data
+import geodata
+import pks
+import snapshot
+
+
+LAST_YEAR = 2022
+GERMANY = 'Bundesrepublik Deutschland'
+
+# The names of the tables in the database carry the years of the first export (see database.TABLES)
+TABLE_SUFFIX = '_2022_until_2018'
+
+# German names of the crimes of the dashboard (see the impressum)
+CRIME_NAMES = {
+    '------': 'Straftaten insgesamt',
+    '100000': 'Straftaten gegen die sexuelle Selbstbestimmung insgesamt',
+    '210000': 'Raub, räuberische Erpressung und räuberischer Angriff auf Kraftfahrer §§ 249-252, 255, 316a StGB',
+    '220000': 'Körperverletzung §§ 223-227, 229, 231 StGB',
+    '232100': 'Freiheitsberaubung § 239 StGB',
+    '232200': 'Nötigung § 240 StGB',
+    '435*00': 'Wohnungseinbruchdiebstahl §§ 244 Abs. 1 Nr. 3 und Abs. 4, 244a StGB',
+    '*26*00': 'Ladendiebstahl insgesamt',
+    '674000': 'Sachbeschädigung §§ 303-305a StGB',
+    '730000': 'Rauschgiftdelikte (soweit nicht bereits mit anderer Schlüsselzahl erfasst)',
+    '891100': 'direkte Beschaffungskriminalität',
+    '010000, 020010': 'Mord § 211 StGB, Totschlag § 212 StGB',
+    'other': 'Sonstige Straftaten',
+}
+TOTAL_KEY = '------'
+OTHER_KEY = 'other'
+
+# Sexes of the tables, 'X' are both
+SEXES = ['W', 'M', 'X']
+
+# The age bands adding up to the group of all ages ('jugendl_u_heranwachsende_14_bis_unter_21')
+AGE_ALL = crime_data.age_groups['All']
+AGE_BANDS = [age for age in crime_data.age_groups.values() if age != AGE_ALL]
+
+# Area of the regions without geometry (longitude and latitude of Germany)
+BOUNDS = (5.9, 47.3, 15.0, 55.1)
+
+# Rows written to PostgreSQL with one COPY
+COPY_ROWS = 200000
+
+
+# ---------------------------------
+# Dimensions
+# ---------------------------------
+
+def crime_keys(count, rng):
+    '''
+    Keys of crimes added to the ones of the dashboard: plain six digit keys
+    that are not matched by a pattern of the crime types (see pks.py).
+    @count (int): The number of keys.
+    @rng (numpy.random.Generator): The random numbers.
+    @return (list of str): The keys, sorted.
+    '''
+    if not count:
+        return []
+    patterns = tuple(pattern for patterns in crime_data.crime_types.values() for pattern in patterns)
+    candidates = tuple(f"{key:06d}" for key in rng.choice(np.arange(100000, 1000000), size=3 * count + 100, replace=False))
+    taken = set(pks.matching_keys(patterns, candidates))
+    return sorted(key for key in candidates if key not in taken)[:count]
+
+
+def dimensions(years=5, regions=16, crimes=0, age_bands=0, seed=0):
+    '''
+    The values of every column of the tables.
+    @years (int): The number of years, the last one is LAST_YEAR.
+    @regions (int): The number of regions besides Germany. The 16 federal
+        states come first, the others are called 'Kreis 001', ...
+    @crimes (int): The number of crimes added to the ones of the dashboard.
+    @age_bands (int): The number of age bands added to the ones of the dashboard
+        (they are not part of the group of all ages).
+    @seed (int): The seed of the random numbers.
+    @return (dict): 'years', 'regions', 'keys', 'names' (key -> name of the crime),
+        'bands' (the age bands, the first ones add up to AGE_ALL) and 'rng'.
+    '''
+    rng = np.random.default_rng(seed)
+    states = crime_data.federal_states[1:]
+    keys = [key for key in CRIME_NAMES if key not in (TOTAL_KEY, OTHER_KEY)]
+    added = crime_keys(crimes, rng)
+    return {
+        'years': list(range(LAST_YEAR - years + 1, LAST_YEAR + 1)),
+        'regions': states[:regions] + [f"Kreis {number:03d}" for number in range(1, regions - len(states) + 1)],
+        'keys': keys + added,
+        'names': dict(CRIME_NAMES, **{key: f"Straftat {key}" for key in added}),
+        'bands': AGE_BANDS + [f"altersgruppe_{21 + 3 * i}_bis_unter_{24 + 3 * i}" for i in range(age_bands)],
+        'rng': rng,
+    }
+
+
+def _columns(shape, axes):
+    '''
+    The columns of a table with one row for every cell of an array.
+    @shape (tuple of int): The shape of the array.
+    @axes (list of tuple): (column, values) for every axis of the array.
+    @return (dict): Column -> categorical (strings) or array (numbers), in C order of the array.
+    '''
+    columns = {}
+    for axis, (column, values) in enumerate(axes):
+        before, after = math.prod(shape[:axis]), math.prod(shape[axis + 1:])
+        codes = np.tile(np.repeat(np.arange(shape[axis], dtype=np.int32), after), before)
+        if isinstance(values[0], str):
+            columns[column] = pd.Categorical.from_codes(codes, categories=values)
+        else:
+            columns[column] = np.asarray(values)[codes]
+    return columns
+
+
+# ---------------------------------
+# Tables
+# ---------------------------------
+
+def offenders(dims):
+    '''
+    The random offenders and the residents.
+    @dims (dict): The dimensions (see dimensions()).
+    @return (numpy.ndarray, numpy.ndarray): The offenders of shape (region, year, age, sex, crime)
+        and the residents of shape (region, age, sex). The first region is Germany, the
+        first age AGE_ALL, the sexes are SEXES and the crimes the total, the keys and 'other'.
+    '''
+    rng = dims['rng']
+    regions, years, bands, keys = len(dims['regions']), len(dims['years']), len(dims['bands']), len(dims['keys'])
+    # Expected offenders: size of the region * age band * sex * frequency of the crime * trend of the years
+    region = rng.lognormal(0, 0.7, regions)
+    band = np.concatenate([[1.0, 1.3, 1.6], rng.uniform(0.5, 1.5, bands - 3)])[:bands]
+    sex = np.array([0.25, 0.75])
+    crime = rng.lognormal(0, 1.2, keys + 1)
+    trend = np.exp(rng.normal(0, 0.06, (regions, 1, 1, 1, keys + 1)) * np.arange(years)[None, :, None, None, None])
+    expected = 60 * region[:, None, None, None, None] * band[None, None, :, None, None] * sex[None, None, None, :, None] * crime * trend
+    counts = rng.poisson(expected).astype(np.int64)
+    residents = (rng.uniform(40000, 120000, (regions, bands, 2)) * region[:, None, None]).astype(np.int64)
+
+    def totals(values, age_axis, sex_axis):
+        # Both sexes, the group of all ages (first age bands) and Germany (sum of the regions)
+        values = np.concatenate([values, values.sum(axis=sex_axis, keepdims=True)], axis=sex_axis)
+        values = np.concatenate([values.take(range(len(AGE_BANDS)), axis=age_axis).sum(axis=age_axis, keepdims=True), values], axis=age_axis)
+        return np.concatenate([values.sum(axis=0, keepdims=True), values], axis=0)
+
+    counts = totals(counts, 2, 3)
+    # The total of all crimes in front
+    counts = np.concatenate([counts.sum(axis=4, keepdims=True), counts], axis=4)
+    return counts, totals(residents, 1, 2)
+
+
+def abs_rel_table(dims, counts, residents):
+    '''
+    The table 'df_bund_laender_abs_rel' with the offenders of all regions (including Germany).
+    @return (pandas.Dataframe): The table.
+    '''
+    keys = [TOTAL_KEY] + dims['keys']
+    counts = counts[..., :-1] # without 'other'
+    relative = np.round(counts / residents[:, None, :, :, None] * 100000, 2)
+    df = pd.DataFrame(_columns(counts.shape, [
+        ('bundesland', [GERMANY] + dims['regions']),
+        ('year', dims['years']),
+        ('age_group', [AGE_ALL] + dims['bands']),
+        ('sexus', SEXES),
+        ('schluessel', keys),
+    ]))
+    df['straftat'] = df['schluessel'].cat.rename_categories([dims['names'][key] for key in keys])
+    df['offenders'] = counts.ravel()
+    df['offenders_rel'] = relative.ravel()
+    return df[['bundesland', 'schluessel', 'straftat', 'year', 'age_group', 'sexus', 'offenders', 'offenders_rel']]
+
+
+def distribution_table(dims, counts):
+    '''
+    The table 'df_distribution_crime' with the share of every crime (and 'other') of all crimes.
+    @return (pandas.Dataframe): The table.
+    '''
+    keys = dims['keys'] + [OTHER_KEY]
+    total = counts[..., :1]
+    share = np.round(np.divide(counts[..., 1:] * 100, total, out=np.zeros(counts[..., 1:].shape), where=total > 0), 2)
+    df = pd.DataFrame(_columns(share.shape, [
+        ('bundesland', [GERMANY] + dims['regions']),
+        ('year', dims['years']),
+        ('age_group', [AGE_ALL] + dims['bands']),
+        ('sexus', SEXES),
+        ('schluessel', keys),
+    ]))
+    df['straftat'] = df['schluessel'].cat.rename_categories([dims['names'][key] for key in keys])
+    df['certain_crime_percent_of_total_crime'] = share.ravel()
+    return df
+
+
+def generate(dims):
+    '''
+    Generate the tables of the dashboard (see database.TABLES).
+    @dims (dict): The dimensions (see dimensions()).
+    @return (dict): Name of the dataframe -> pandas.Dataframe.
+    '''
+    counts, residents = offenders(dims)
+    abs_rel = abs_rel_table(dims, counts, residents)
+    distribution = distribution_table(dims, counts)
+    del counts
+    return {
+        'df_distribution_crime': distribution,
+        'df_laender_abs_rel': abs_rel[abs_rel['bundesland'] != GERMANY].drop(columns='straftat').reset_index(drop=True),
+        'df_bund_laender_abs_rel': abs_rel,
+    }
+
+
+# ---------------------------------
+# Geodata
+# ---------------------------------
+
+def region_geodata(regions, vertices=64, source_file=snapshot.GEODATA_FILE):
+    '''
+    GeoJSON of the regions: the federal states from the real geodata (if there),
+    every other region is a polygon in a cell of a grid over Germany.
+    @regions (list of str): The regions (without Germany).
+    @vertices (int): The number of points of a generated polygon.
+    @source_file (str): The geodata of the federal states.
+    @return (dict): The GeoJSON (property 'NAME_1' is the region).
+    '''
+    features = {}
+    if os.path.exists(source_file):
+        with open(source_file) as f:
+            features = {feature['properties']['NAME_1']: feature for feature in json.load(f)['features']}
+    missing = [region for region in regions if region not in features]
+    west, south, east, north = BOUNDS
+    columns = max(1, math.ceil(math.sqrt(len(missing) * (east - west) * geodata.LON_SCALE / (north - south))))
+    rows = max(1, math.ceil(len(missing) / columns))
+    width, height = (east - west) / columns, (north - south) / rows
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    out = []
+    for region in regions:
+        if region in features:
+            out.append({'type': 'Feature', 'properties': {'NAME_1': region}, 'geometry': features[region]['geometry']})
+            continue
+        row, column = divmod(missing.index(region), columns)
+        center = (west + (column + 0.5) * width, south + (row + 0.5) * height)
+        ring = [[round(center[0] + 0.45 * width * math.cos(angle), 4), round(center[1] + 0.45 * height * math.sin(angle), 4)] for angle in angles]
+        out.append({'type': 'Feature', 'properties': {'NAME_1': region}, 'geometry': {'type': 'MultiPolygon', 'coordinates': [[ring + ring[:1]]]}})
+    return {'type': 'FeatureCollection', 'features': out}
+
+
+def write_geodata(geo_data, directory):
+    '''
+    Write the GeoJSON and its levels of detail (see geodata.py) under the names the dashboard reads.
+    @geo_data (dict): The GeoJSON.
+    @directory (str): Where to write the files to.
+    @return (list of str): The written files.
+    '''
+    os.makedirs(directory, exist_ok=True)
+    source = os.path.join(directory, os.path.basename(snapshot.GEODATA_FILE))
+    with open(source, 'w') as f:
+        json.dump(geo_data, f, separators=(',', ':'), ensure_ascii=False)
+    geodata.write_levels(source, directory)
+    return [source] + [geodata.level_file(level, directory) for level in geodata.LEVELS]
+
+
+# ---------------------------------
+# Output
+# ---------------------------------
+
+def _sql_type(series):
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return 'bigint'
+    if pd.api.types.is_float_dtype(series.dtype):
+        return 'double precision'
+    return 'text'
+
+
+def load_postgres(dataframes, dsn):
+    '''
+    Write the tables to a PostgreSQL database (replacing tables of the same name).
+    @dataframes (dict): Name of the dataframe -> pandas.Dataframe.
+    @dsn (str): The connection, e.g. 'host=localhost dbname=crime user=postgres'.
+    '''
+    import psycopg2
+    with psycopg2.connect(dsn) as con:
+        with con.cursor() as cur:
+            for name, df in dataframes.items():
+                table = f"public.{name}{TABLE_SUFFIX}"
+                columns = ', '.join(f"{column} {_sql_type(df[column])}" for column in df.columns)
+                cur.execute(f"DROP TABLE IF EXISTS {table}; CREATE TABLE {table} ({columns});")
+                for start in range(0, len(df), COPY_ROWS):
+                    buffer = io.StringIO()
+                    df.iloc[start:start + COPY_ROWS].to_csv(buffer, index=False, header=False)
+                    buffer.seek(0)
+                    cur.copy_expert(f"COPY {table} FROM STDIN WITH (FORMAT csv)", buffer)
+                cur.execute(f"ANALYZE {table};")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Synthetic data in the shape of the PKS tables of the dashboard.')
+    parser.add_argument('--snapshot', help='write a snapshot to this directory')
+    parser.add_argument('--postgres', help="load the tables into this PostgreSQL database, e.g. 'host=localhost dbname=crime user=postgres'")
+    parser.add_argument('--geodata', help='also write the GeoJSON of the regions to this directory (the snapshot has its own)')
+    parser.add_argument('--years', type=int, default=5, help=f"number of years until {LAST_YEAR} (default: 5)")
+    parser.add_argument('--regions', type=int, default=16, help='number of regions besides Germany, the first 16 are the federal states (default: 16)')
+    parser.add_argument('--crimes', type=int, default=0, help='number of crime keys added to the ones of the dashboard (default: 0)')
+    parser.add_argument('--age-bands', type=int, default=0, help='number of age bands added to the ones of the dashboard (default: 0)')
+    parser.add_argument('--vertices', type=int, default=64, help='points of the polygon of a generated region (default: 64)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random numbers (default: 0)')
+    args = parser.parse_args()
+    if not (args.snapshot or args.postgres or args.geodata):
+        parser.error('give at least one of --snapshot, --postgres and --geodata')
+
+    start = time.perf_counter()
+    dims = dimensions(args.years, args.regions, args.crimes, args.age_bands, args.seed)
+    dataframes = generate(dims)
+    for name, df in dataframes.items():
+        print(f"{name:<25} {len(df):>10} rows {df.memory_usage(deep=True).sum() / 2**20:>9.1f} MiB")
+    print(f"Generated in {time.perf_counter() - start:.1f} s")
+    geo_data = region_geodata(dims['regions'], args.vertices)
+    if args.geodata:
+        write_geodata(geo_data, args.geodata)
+    if args.snapshot:
+        files = write_geodata(geo_data, args.snapshot)
+        compacted, report = compact.compact_tables(dataframes)
+        snapshot.write_snapshot(compacted, args.snapshot, geodata_files=files,
+                                source_tables={name: name + TABLE_SUFFIX for name in compacted})
+        print(f"Snapshot written to {args.snapshot}")
+    if args.postgres:
+        load_postgres(dataframes, args.postgres)
+        print('Tables loaded into PostgreSQL')
@@ -0,0 +1,44 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Smoke test of benchmark.py.
+#
+# Generates a small synthetic snapshot (see synthetic.py)
+# and plays every sequence of the benchmark once, so a
+# change of app.py that breaks the benchmark fails here:
+#
+#   python -m unittest discover tests
+# -----------------------------------------------------
+
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_script(*args):
+    '''
+    Run a script of the dashboard in a new process.
+    @args (str): The script and its arguments.
+    @return (subprocess.CompletedProcess): The finished process.
+    '''
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, timeout=900)
+
+
+class BenchmarkSmokeTest(unittest.TestCase):
+
+    def test_sequences_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            result = run_script('synthetic.py', '--snapshot', directory, '--vertices', '8')
+            self.assertEqual(result.returncode, 0, result.stderr)
+            result = run_script('benchmark.py', '--snapshot', directory, '--smoke')
+            self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+            self.assertIn('All sequences ran.', result.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Tests of the connection pool of database.py.
+#
+# The connections are replaced by objects answering every
+# query after a short wait, the pool itself is the one of
+# psycopg2, so more reads at once than it has connections
+# show whether they queue or fail:
+#
+#   python -m unittest discover tests
+# -----------------------------------------------------
+
+
+import os
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+
+from psycopg2 import extensions
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+class Cursor:
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = [SimpleNamespace(name='value')]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        pool = self.connection.pool
+        with pool.lock:
+            pool.active += 1
+            pool.peak = max(pool.peak, pool.active)
+        time.sleep(0.05)
+        with pool.lock:
+            pool.active -= 1
+
+    def fetchall(self):
+        return [(1,)]
+
+
+class Connection:
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.autocommit = True
+        self.closed = 0
+        self.info = SimpleNamespace(transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+
+    def cursor(self):
+        return Cursor(self)
+
+    def close(self):
+        self.closed = 1
+
+
+class Pool(ThreadedConnectionPool):
+    '''
+    The pool of psycopg2 (which raises PoolError when all connections are
+    in use), with connections that need no database.
+    '''
+
+    def __init__(self, minconn, maxconn):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        super().__init__(minconn, maxconn)
+
+    def _connect(self, key=None):
+        conn = Connection(self)
+        if key is not None:
+            self._used[key] = conn
+            self._rused[id(conn)] = key
+        else:
+            self._pool.append(conn)
+        return conn
+
+
+def read_at_once(con_pool, reads):
+    '''
+    Run reads with read_dataframe() at the same time on a pool.
+    @return (list of pandas.Dataframe): The results.
+    '''
+    with mock.patch.object(database, 'get_connection_pool', lambda: con_pool):
+        with ThreadPoolExecutor(max_workers=reads) as executor:
+            return list(executor.map(lambda i: database.read_dataframe('SELECT 1 AS value;'), range(reads)))
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def test_plain_pool_fails_when_exhausted(self):
+        # What BlockingPool is there for
+        with self.assertRaises(PoolError):
+            read_at_once(Pool(1, 2), 8)
+
+    def test_more_reads_than_connections_queue(self):
+        pool = Pool(1, 3)
+        results = read_at_once(database.BlockingPool(pool), 12)
+        self.assertEqual(len(results), 12)
+        self.assertTrue(all(df['value'].tolist() == [1] for df in results))
+        self.assertLessEqual(pool.peak, 3)
+        self.assertEqual(pool.active, 0)
+
+    def test_timeout_when_no_connection_gets_free(self):
+        con_pool = database.BlockingPool(Pool(0, 1), timeout=0.01)
+        con = con_pool.getconn()
+        with self.assertRaises(PoolError):
+            con_pool.getconn()
+        con_pool.putconn(con)
+        con_pool.putconn(con_pool.getconn())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Tests of the growth rates of crime_data.py.
+#
+# The growth rates were a table of the database
+# ('df_growth_rate', the values in % as text and 'n.a.'
+# if there is none), now they are computed from the
+# time series. A small time series is compared with the
+# rows that table had for it:
+#
+#   python -m unittest discover tests
+# -----------------------------------------------------
+
+
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import crime_data
+
+
+AGE = crime_data.age_groups['All']
+
+# Rows of 'df_bund_laender_abs_rel', not sorted by year
+ABS_REL = pd.DataFrame(
+    [
+        # Down to 0 offenders
+        ('Bayern', '220000', 'Körperverletzung', 2021, AGE, 'X', 250, 12.5),
+        ('Bayern', '220000', 'Körperverletzung', 2020, AGE, 'X', 200, 10.0),
+        ('Bayern', '220000', 'Körperverletzung', 2022, AGE, 'X', 0, 0.0),
+        # Up from 0 offenders
+        ('Bayern', '730000', 'Rauschgiftdelikte', 2020, AGE, 'X', 0, 0.0),
+        ('Bayern', '730000', 'Rauschgiftdelikte', 2021, AGE, 'X', 30, 1.5),
+        ('Bayern', '730000', 'Rauschgiftdelikte', 2022, AGE, 'X', 45, 2.25),
+        # Rounded to two decimals
+        ('Bremen', '220000', 'Körperverletzung', 2020, AGE, 'X', 3, 0.3),
+        ('Bremen', '220000', 'Körperverletzung', 2021, AGE, 'X', 4, 0.4),
+        ('Bremen', '220000', 'Körperverletzung', 2022, AGE, 'X', 5, 0.5),
+    ],
+    columns=['bundesland', 'schluessel', 'straftat', 'year', 'age_group', 'sexus', 'offenders', 'offenders_rel'],
+)
+
+# The rows of the table 'df_growth_rate' for ABS_REL
+GROWTH_RATE = pd.DataFrame(
+    [
+        ('Bayern', '220000', 2020, 'n.a.', 'n.a.'),
+        ('Bayern', '220000', 2021, '25.0', '25.0'),
+        ('Bayern', '220000', 2022, '-100.0', '-100.0'),
+        ('Bayern', '730000', 2020, 'n.a.', 'n.a.'),
+        ('Bayern', '730000', 2021, 'n.a.', 'n.a.'),
+        ('Bayern', '730000', 2022, '50.0', '50.0'),
+        ('Bremen', '220000', 2020, 'n.a.', 'n.a.'),
+        ('Bremen', '220000', 2021, '33.33', '33.33'),
+        ('Bremen', '220000', 2022, '25.0', '25.0'),
+    ],
+    columns=['bundesland', 'schluessel', 'year', 'growth_abs', 'growth_rel'],
+)
+
+
+def expected(state, key):
+    '''
+    The growth rates of a time series as they were in the table 'df_growth_rate'.
+    @state (str): The federal state.
+    @key (str): The 'schluessel' of the crime.
+    @return (pandas.Dataframe): 'year', 'growth_abs' and 'growth_rel' (Float64, <NA> for 'n.a.').
+    '''
+    df = GROWTH_RATE[(GROWTH_RATE['bundesland'] == state) & (GROWTH_RATE['schluessel'] == key)]
+    df = df[['year', 'growth_abs', 'growth_rel']].reset_index(drop=True)
+    for column in ('growth_abs', 'growth_rel'):
+        df[column] = pd.to_numeric(df[column].mask(df[column] == 'n.a.')).astype('Float64')
+    return df
+
+
+def values(df):
+    '''
+    The year and growth columns of a result, with a fresh index.
+    @df (pandas.Dataframe): Growth rates of one time series.
+    @return (pandas.Dataframe): 'year', 'growth_abs' and 'growth_rel'.
+    '''
+    df = df[['year', 'growth_abs', 'growth_rel']].reset_index(drop=True)
+    return df.astype({'year': 'int64'})
+
+
+class GrowthRatesTest(unittest.TestCase):
+
+    def test_same_as_growth_rate_table(self):
+        df = crime_data.growth_rates(ABS_REL)
+        for state, key in [('Bayern', '220000'), ('Bayern', '730000'), ('Bremen', '220000')]:
+            with self.subTest(state=state, key=key):
+                series = df[(df['bundesland'] == state) & (df['schluessel'] == key)]
+                pd.testing.assert_frame_equal(values(series), expected(state, key))
+
+    def test_get_df_growth_rate(self):
+        # The same through the chart function, on the loaded (compacted and indexed) table
+        saved = (crime_data.tables, crime_data.partitions, crime_data.slice_reader, crime_data.years, crime_data.cube)
+        try:
+            crime_data.cube = None
+            crime_data.set_tables({'df_bund_laender_abs_rel': ABS_REL})
+            df = crime_data.get_df_growth_rate('Bayern', ['220000'], 2022, AGE, 'X')
+        finally:
+            crime_data.tables, crime_data.partitions, crime_data.slice_reader, crime_data.years, crime_data.cube = saved
+        pd.testing.assert_frame_equal(values(df), expected('Bayern', '220000'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# -----------------------------------------------------
+# Juvenile Crime in Germany.
+# Tests of the PKS key patterns of pks.py.
+#
+# Every pattern of the crime types of the dashboard is
+# matched against a small list of keys, once with its
+# summary key in the table (taken as it is) and once
+# without (expanded to the plain keys):
+#
+#   python -m unittest discover tests
+# -----------------------------------------------------
+
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pks
+
+
+# Plain keys of the PKS and the summary keys of the tables
+PLAIN = ('010000', '020010', '020020', '326100', '326110', '430000', '435100', '435200', '435210', '926500')
+SUMMARY = ('------', '010000, 020010', '435*00', '*26*00', 'other')
+
+
+def match(pattern, keys=PLAIN):
+    '''
+    The keys matching one pattern.
+    @pattern (str): The pattern, e.g. '435*00'.
+    @keys (tuple of str): The distinct keys of the table.
+    @return (tuple of str): The matching keys.
+    '''
+    return pks.matching_keys((pattern,), keys)
+
+
+class ExpandedPatternTest(unittest.TestCase):
+    # Without a summary key the pattern is expanded to the plain keys
+
+    def test_wildcard(self):
+        self.assertEqual(match('435*00'), ('435100', '435200'))
+
+    def test_leading_wildcard(self):
+        self.assertEqual(match('*26*00'), ('326100', '926500'))
+
+    def test_prefix(self):
+        self.assertEqual(match('43'), ('430000', '435100', '435200', '435210'))
+
+    def test_commas(self):
+        self.assertEqual(match('010000, 020010'), ('010000', '020010'))
+
+    def test_no_match(self):
+        self.assertEqual(match('999*00'), ())
+
+
+class SummaryKeyTest(unittest.TestCase):
+    # A summary key in the table is taken as it is, not added up from its subkeys
+
+    def test_summary_keys_are_literal(self):
+        keys = SUMMARY + PLAIN
+        for pattern in ('435*00', '*26*00', '010000, 020010'):
+            with self.subTest(pattern=pattern):
+                self.assertEqual(match(pattern, keys), (pattern,))
+
+    def test_prefix_skips_summary_keys(self):
+        self.assertEqual(match('43', SUMMARY + PLAIN), ('430000', '435100', '435200', '435210'))
+
+    def test_group_of_patterns(self):
+        # An own group, e.g. {"Theft": ["435*00", "*26*00"]}, in the order of the table
+        keys = SUMMARY + PLAIN
+        self.assertEqual(pks.matching_keys(('435*00', '*26*00'), keys), ('435*00', '*26*00'))
+        self.assertEqual(pks.matching_keys(('435*00', '*26*00'), PLAIN), ('326100', '435100', '435200', '926500'))
+
+
+if __name__ == '__main__':
+    unittest.main()